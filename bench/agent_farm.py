@@ -0,0 +1,309 @@
+"""
+A farm of simulated SNMP agents on localhost, for benchmarks and for running
+the tools without the Docker containers.
+
+    python bench/agent_farm.py --agents 60 --base-port 16101 --interfaces 4
+    python bench/agent_farm.py --agents 500 --latency 20 --loss 0.01 --farm-processes 4
+    python bench/agent_farm.py --snmprec device.snmprec
+
+Every agent answers SNMPv1/v2c GET, GETNEXT and GETBULK for the system
+group, ifTable and ifXTable with counters that grow with time, or serves a
+snmpsim-style .snmprec file instead. Latency, jitter and packet loss are
+applied per request.
+"""
+import argparse
+import asyncio
+import bisect
+import multiprocessing
+import random
+import threading
+import time
+from pyasn1.codec.ber import decoder, encoder
+from pyasn1.type import univ
+from pysnmp.proto import api, rfc1902, rfc1905
+
+
+NO_SUCH_NAME = 2
+
+# Value types of .snmprec files by their type tag
+SNMPREC_TYPES = {
+    "2": rfc1902.Integer32,
+    "4": rfc1902.OctetString,
+    "6": rfc1902.ObjectIdentifier,
+    "64": rfc1902.IpAddress,
+    "65": rfc1902.Counter32,
+    "66": rfc1902.Gauge32,
+    "67": rfc1902.TimeTicks,
+    "70": rfc1902.Counter64,
+}
+
+
+
+def oid(text):
+    return tuple(int(part) for part in text.strip('.').split('.'))
+
+
+def counter(started, rate, counter_type, mask):
+    # Counters grow at `rate` per second since the agent started, wrapping like the real thing
+    return lambda now: counter_type(int((now - started) * rate) & mask)
+
+
+def build_agent_data(port, interfaces=4, started=None):
+    """
+    The objects of one simulated agent as a list of (OID tuple, value), where
+    a value may be a function of the current time.
+    """
+    started = time.time() if started is None else started
+    data = [
+        (oid('1.3.6.1.2.1.1.1.0'), rfc1902.OctetString(f"Simulated agent on port {port}")),
+        (oid('1.3.6.1.2.1.1.2.0'), rfc1902.ObjectIdentifier(oid('1.3.6.1.4.1.8072.3.2.10'))),
+        (oid('1.3.6.1.2.1.1.3.0'), lambda now: rfc1902.TimeTicks(int((now - started) * 100) & 0xFFFFFFFF)),
+        (oid('1.3.6.1.2.1.1.4.0'), rfc1902.OctetString("bench@localhost")),
+        (oid('1.3.6.1.2.1.1.5.0'), rfc1902.OctetString(f"agent{port}")),
+        (oid('1.3.6.1.2.1.1.6.0'), rfc1902.OctetString("Benchmark farm")),
+        (oid('1.3.6.1.2.1.2.1.0'), rfc1902.Integer32(interfaces)),
+    ]
+    for index in range(1, interfaces + 1):
+        rate = 1000 * index + port % 1000
+        mac = bytes([0x02, 0x42, port >> 8 & 0xFF, port & 0xFF, index >> 8 & 0xFF, index & 0xFF])
+        data += [
+            (oid(f'1.3.6.1.2.1.2.2.1.1.{index}'), rfc1902.Integer32(index)),
+            (oid(f'1.3.6.1.2.1.2.2.1.2.{index}'), rfc1902.OctetString("lo" if index == 1 else f"eth{index - 2}")),
+            (oid(f'1.3.6.1.2.1.2.2.1.6.{index}'), rfc1902.OctetString(mac)),
+            (oid(f'1.3.6.1.2.1.2.2.1.10.{index}'), counter(started, rate, rfc1902.Counter32, 0xFFFFFFFF)),
+            (oid(f'1.3.6.1.2.1.2.2.1.16.{index}'), counter(started, rate // 2, rfc1902.Counter32, 0xFFFFFFFF)),
+            (oid(f'1.3.6.1.2.1.31.1.1.1.6.{index}'), counter(started, rate, rfc1902.Counter64, 2 ** 64 - 1)),
+            (oid(f'1.3.6.1.2.1.31.1.1.1.10.{index}'), counter(started, rate // 2, rfc1902.Counter64, 2 ** 64 - 1)),
+        ]
+    data.sort(key=lambda item: item[0])
+    return data
+
+
+def load_snmprec(path):
+    """
+    Read a snmpsim .snmprec file ("OID|type|value" per line, type 4x for hex).
+    """
+    data = []
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            name, tag, value = line.split('|', 2)
+            if tag == "4x":
+                value = rfc1902.OctetString(hexValue=value)
+            else:
+                value = SNMPREC_TYPES[tag](value)
+            data.append((oid(name), value))
+    data.sort(key=lambda item: item[0])
+    return data
+
+
+class SimulatedAgent(asyncio.DatagramProtocol):
+    """
+    Answers requests from a sorted list of objects after `latency` (plus up
+    to `jitter`) seconds, dropping a `loss` fraction of them.
+    """
+    def __init__(self, data, community='public', latency=0.0, jitter=0.0, loss=0.0):
+        self.oids = [name for name, _ in data]
+        self.values = [value for _, value in data]
+        self.community = community
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.transport = None
+        self.requests = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.requests += 1
+        if self.loss and random.random() < self.loss:
+            return
+        response = self.respond(data)
+        if response is None:
+            return
+        delay = self.latency + random.uniform(0, self.jitter) if self.jitter else self.latency
+        if delay > 0:
+            asyncio.get_event_loop().call_later(delay, self.transport.sendto, response, addr)
+        else:
+            self.transport.sendto(response, addr)
+
+    def value(self, position, now, v1):
+        value = self.values[position]
+        value = value(now) if callable(value) else value
+        # SNMPv1 has no Counter64, such objects are invisible to v1 managers
+        if v1 and isinstance(value, rfc1902.Counter64):
+            return None
+        return value
+
+    def get(self, name, now, v1):
+        position = bisect.bisect_left(self.oids, name)
+        if position < len(self.oids) and self.oids[position] == name:
+            value = self.value(position, now, v1)
+            if value is not None:
+                return name, value
+        return name, None if v1 else rfc1905.noSuchInstance
+
+    def next(self, name, now, v1):
+        position = bisect.bisect_right(self.oids, name)
+        while position < len(self.oids):
+            value = self.value(position, now, v1)
+            if value is not None:
+                return self.oids[position], value
+            position += 1
+        return name, None if v1 else rfc1905.endOfMibView
+
+    def respond(self, message):
+        try:
+            version = int(api.decodeMessageVersion(message))
+            pMod = api.protoModules[version]
+            request, _ = decoder.decode(message, asn1Spec=pMod.Message())
+        except Exception:
+            return None
+        if str(pMod.apiMessage.getCommunity(request)) != self.community:
+            return None
+
+        v1 = version == api.protoVersion1
+        response = pMod.apiMessage.getResponse(request)
+        requestPDU = pMod.apiMessage.getPDU(request)
+        responsePDU = pMod.apiMessage.getPDU(response)
+        names = [tuple(name) for name, _ in pMod.apiPDU.getVarBinds(requestPDU)]
+        now = time.time()
+
+        if requestPDU.isSameTypeWith(pMod.GetRequestPDU()):
+            varBinds = [self.get(name, now, v1) for name in names]
+        elif requestPDU.isSameTypeWith(pMod.GetNextRequestPDU()):
+            varBinds = [self.next(name, now, v1) for name in names]
+        elif not v1 and requestPDU.isSameTypeWith(pMod.GetBulkRequestPDU()):
+            nonRepeaters = min(int(pMod.apiBulkPDU.getNonRepeaters(requestPDU)), len(names))
+            maxRepetitions = int(pMod.apiBulkPDU.getMaxRepetitions(requestPDU))
+            varBinds = [self.next(name, now, v1) for name in names[:nonRepeaters]]
+            repeaters = names[nonRepeaters:]
+            for _ in range(maxRepetitions if repeaters else 0):
+                row = [self.next(name, now, v1) for name in repeaters]
+                varBinds += row
+                if all(value is rfc1905.endOfMibView for _, value in row):
+                    break
+                repeaters = [name for name, _ in row]
+        else:
+            return None
+
+        missing = [position for position, (_, value) in enumerate(varBinds) if value is None]
+        if missing:
+            # SNMPv1 reports the first missing object as noSuchName and echoes the request
+            pMod.apiPDU.setErrorStatus(responsePDU, NO_SUCH_NAME)
+            pMod.apiPDU.setErrorIndex(responsePDU, missing[0] + 1)
+            varBinds = [(name, univ.Null('')) for name in names]
+        pMod.apiPDU.setVarBinds(responsePDU, [(rfc1902.ObjectName(name), value) for name, value in varBinds])
+        return encoder.encode(response)
+
+
+def serve(ports, options, ready, stop, host='127.0.0.1'):
+    """
+    Run agents on `ports` until `stop` (a threading or multiprocessing Event)
+    is set, setting `ready` once they are all listening.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    started = time.time()
+    snmprec = load_snmprec(options["snmprec"]) if options.get("snmprec") else None
+    transports = []
+    try:
+        for port in ports:
+            data = snmprec or build_agent_data(port, options.get("interfaces", 4), started)
+            agent = SimulatedAgent(data, options.get("community", 'public'), options.get("latency", 0.0),
+                                   options.get("jitter", 0.0), options.get("loss", 0.0))
+            transport, _ = loop.run_until_complete(
+                loop.create_datagram_endpoint(lambda agent=agent: agent, local_addr=(host, port)))
+            transports.append(transport)
+        ready.set()
+        loop.run_until_complete(loop.run_in_executor(None, stop.wait))
+    finally:
+        for transport in transports:
+            transport.close()
+        loop.close()
+
+
+class AgentFarm:
+    """
+    `count` simulated agents on consecutive ports, served from a background
+    thread (processes=0) or split across `processes` subprocesses so the
+    agents' CPU time does not count against the process being measured.
+    """
+    def __init__(self, count=60, base_port=16101, processes=1, **options):
+        self.ports = list(range(base_port, base_port + count))
+        self.processes = processes
+        self.options = options
+        self._workers = []
+        self._stop = None
+
+    @property
+    def spec(self):
+        return f"127.0.0.1:{self.ports[0]}-{self.ports[-1]}"
+
+    def start(self, timeout=30):
+        if self.processes:
+            context = multiprocessing.get_context("spawn")
+            self._stop = context.Event()
+            for number in range(self.processes):
+                ready = context.Event()
+                worker = context.Process(target=serve, daemon=True,
+                                         args=(self.ports[number::self.processes], self.options, ready, self._stop))
+                worker.start()
+                self._workers.append((worker, ready))
+        else:
+            self._stop = threading.Event()
+            ready = threading.Event()
+            worker = threading.Thread(target=serve, args=(self.ports, self.options, ready, self._stop), daemon=True)
+            worker.start()
+            self._workers.append((worker, ready))
+        for worker, ready in self._workers:
+            if not ready.wait(timeout):
+                self.stop()
+                raise RuntimeError("Simulated agents did not start, are the ports in use?")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for worker, _ in self._workers:
+            worker.join(5)
+        self._workers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def add_farm_arguments(parser, base_port=16101):
+    parser.add_argument("--agents", type=int, default=60)
+    parser.add_argument("--base-port", type=int, default=base_port)
+    parser.add_argument("--interfaces", type=int, default=4, help="ifTable rows per agent")
+    parser.add_argument("--latency", type=float, default=0.0, help="response delay in milliseconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay in milliseconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="fraction of requests dropped")
+    parser.add_argument("--community", default='public')
+    parser.add_argument("--snmprec", help="serve this .snmprec file from every agent")
+    parser.add_argument("--farm-processes", type=int, default=1, help="0 serves the agents from a thread")
+
+
+def farm_from_arguments(args):
+    return AgentFarm(args.agents, args.base_port, args.farm_processes, interfaces=args.interfaces,
+                     latency=args.latency / 1000, jitter=args.jitter / 1000, loss=args.loss,
+                     community=args.community, snmprec=args.snmprec)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run simulated SNMP agents until interrupted.")
+    add_farm_arguments(parser)
+    args = parser.parse_args()
+    farm = farm_from_arguments(args).start()
+    print(f"Serving {len(farm.ports)} agents on {farm.spec}, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        farm.stop()
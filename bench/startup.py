@@ -0,0 +1,108 @@
+"""
+Startup benchmark: import cost of each entry point, from `python -X importtime`.
+
+    python bench/startup.py                     # measure and print
+    python bench/startup.py --record            # also append to bench/startup_history.jsonl
+    python bench/startup.py --top 10            # show the slowest imports too
+
+Each entry point is imported in a fresh interpreter `--repeat` times and the
+median is reported, next to the change since the last recorded run.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+HISTORY_FILE = os.path.join(ROOT, "bench", "startup_history.jsonl")
+
+# What each entry point / mode imports before it can do any work
+ENTRY_POINTS = {
+    "query": "import query",
+    "query option 1": "import query, async_poller, sharded_sweep, discovery",
+    "query option 2": "import query, traffic_view; from PyQt5.QtWidgets import QApplication",
+    "task3gui": "import task3gui",
+    "snmpquery": "import snmpquery",
+    "snmpquery discover": "import snmpquery, async_poller, discovery",
+}
+
+
+
+def import_times(statement):
+    """
+    Run `statement` under -X importtime and return (total microseconds,
+    {top-level module: cumulative microseconds}).
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            cwd=SRC, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented; top-level ones add up to the total
+        if not name[1:].startswith(" "):
+            modules[name.strip()] = int(cumulative)
+    return sum(modules.values()), modules
+
+
+def measure(statement, repeat):
+    totals, modules = [], {}
+    for _ in range(repeat):
+        total, modules = import_times(statement)
+        totals.append(total)
+    return statistics.median(totals), modules
+
+
+def last_record(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as file:
+        lines = [line for line in file if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def git_commit():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest top-level imports")
+    parser.add_argument("--record", action="store_true", help=f"append the results to {HISTORY_FILE}")
+    parser.add_argument("--history", default=HISTORY_FILE)
+    args = parser.parse_args()
+
+    previous = (last_record(args.history) or {}).get("results", {})
+    results = {}
+    for name, statement in ENTRY_POINTS.items():
+        try:
+            total, modules = measure(statement, args.repeat)
+        except RuntimeError as e:
+            print(f"{name:<22} failed: {e}")
+            continue
+        results[name] = round(total / 1000, 1)
+        change = ""
+        if name in previous:
+            change = f"  ({results[name] - previous[name]:+.1f} ms)"
+        print(f"{name:<22} {results[name]:>8.1f} ms{change}")
+        for module, cumulative in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {module:<30} {cumulative / 1000:>8.1f} ms")
+
+    if args.record:
+        with open(args.history, "a", encoding="utf-8") as file:
+            file.write(json.dumps({"time": time.strftime('%Y-%m-%d %H:%M:%S'), "commit": git_commit(),
+                                   "python": sys.version.split()[0], "results": results}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
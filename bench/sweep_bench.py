@@ -0,0 +1,124 @@
+"""
+Sweep benchmarks against a local farm of simulated agents (see agent_farm.py).
+
+    python bench/sweep_bench.py --agents 200 --latency 5
+    python bench/sweep_bench.py --agents 1000 --loss 0.02 --scenarios task_3 gui_refresh --record
+
+For each scenario this reports wall time, polls per second, CPU time of the
+benchmark process and its peak RSS. The agents run in their own processes by
+default so their CPU is not counted. --record appends the results, with the
+farm settings, to bench/sweep_history.jsonl so regressions show up.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+from agent_farm import add_farm_arguments, farm_from_arguments
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from inventory import Inventory  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+HISTORY_FILE = os.path.join(ROOT, "bench", "sweep_history.jsonl")
+
+
+
+def bench_task_3(targets, args):
+    import query
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            query.task_3(args.sweep_processes, targets)
+        finally:
+            sys.stdout = stdout
+
+
+def bench_get_supported_interfaces(targets, args):
+    from snmp_client import get_supported_interfaces
+    for ip, port, *_ in targets:
+        get_supported_interfaces(ip, port)
+
+
+def bench_gui_refresh(targets, args):
+    from task3gui import SNMPQueryThread
+    with tempfile.TemporaryDirectory() as directory:
+        # run() is called directly, the sweep is the same without a Qt event loop
+        thread = SNMPQueryThread(os.path.join(directory, "hosts.db"), targets, args.sweep_processes)
+        try:
+            for _ in range(args.refreshes):
+                thread.run()
+        finally:
+            thread.close()
+            thread.db_manager.conn.close()
+
+
+# Scenario -> (function, polls per target)
+SCENARIOS = {
+    "task_3": (bench_task_3, lambda args: 1),
+    "get_supported_interfaces": (bench_get_supported_interfaces, lambda args: 1),
+    "gui_refresh": (bench_gui_refresh, lambda args: args.refreshes),
+}
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20, 1)
+
+
+def run_scenario(function, targets, polls, args):
+    gc.collect()
+    cpu, wall = time.process_time(), time.perf_counter()
+    function(targets, args)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return {"wall_s": round(wall, 3), "polls_per_s": round(polls / wall, 1), "cpu_s": round(cpu, 3),
+            "peak_rss_mb": peak_rss_mb()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_farm_arguments(parser, base_port=20101)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--sweep-processes", type=int, help="run the sweeps sharded across processes")
+    parser.add_argument("--refreshes", type=int, default=2, help="GUI refresh sweeps (the first one inserts)")
+    parser.add_argument("--record", action="store_true", help=f"append the results to {HISTORY_FILE}")
+    parser.add_argument("--history", default=HISTORY_FILE)
+    args = parser.parse_args()
+
+    results = {}
+    with farm_from_arguments(args) as farm:
+        targets = list(Inventory.from_specs(farm.spec))
+        print(f"{len(targets)} agents on {farm.spec}, latency {args.latency} ms, loss {args.loss:.1%}")
+        for name in args.scenarios:
+            function, polls = SCENARIOS[name]
+            try:
+                results[name] = run_scenario(function, targets, polls(args) * len(targets), args)
+            except ImportError as e:
+                print(f"{name:<26} skipped: {e}")
+                continue
+            result = results[name]
+            print(f"{name:<26} {result['wall_s']:>8.2f} s {result['polls_per_s']:>9.1f} polls/s "
+                  f"{result['cpu_s']:>8.2f} s CPU  peak RSS {result['peak_rss_mb']} MB")
+
+    if args.record:
+        settings = {key: getattr(args, key) for key in ("agents", "interfaces", "latency", "jitter", "loss",
+                                                        "sweep_processes", "refreshes")}
+        with open(args.history, "a", encoding="utf-8") as file:
+            file.write(json.dumps({"time": time.strftime('%Y-%m-%d %H:%M:%S'), "settings": settings,
+                                   "results": results}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
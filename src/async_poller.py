@@ -0,0 +1,372 @@
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pysnmp.proto.rfc1902 import ObjectName
+from pysnmp.proto.rfc1905 import EndOfMibView
+from snmp_session import SessionPool
+from inventory import Target
+from metrics import metrics
+from result_cache import SYS_UPTIME_OID
+from snmp_client import MAX_VARBINDS, MAX_REPETITIONS, split_oids, apply_response, merge_table_rows
+from snmp_values import decode_value
+
+# pysnmp's asyncio transport only works up to Python 3.9 (it fails to connect
+# on 3.10 and no longer imports on 3.11, where asyncio.coroutine is gone).
+# Later versions send each request with the asyncore API on a pool of threads.
+ASYNCIO_CARRIER = sys.version_info < (3, 10)
+
+if ASYNCIO_CARRIER:
+    from pysnmp.hlapi.asyncio import getCmd, nextCmd, bulkCmd, UdpTransportTarget
+else:
+    from pysnmp.hlapi.asyncore import getCmd, nextCmd, bulkCmd, UdpTransportTarget
+
+
+
+class AsyncPoller:
+    """
+    Query many agents concurrently with pysnmp's asyncio API (or, without
+    ASYNCIO_CARRIER, with blocking requests on `limit` threads, each with its
+    own engine).
+
+    Community, version, SNMPv3 credentials, timeout and retries default to the
+    poller's settings and can be overridden per Target. With a TimeoutPolicy, targets without
+    their own timeout get adaptive timeouts instead, and quarantined agents are
+    skipped until their next probe. The poller's asyncio engine binds to the
+    event loop it is first used in, so create and use one poller per loop.
+    Requests, errors, sweeps and jobs in flight are recorded in `registry`.
+    With a ResultCache, get_many serves slow-changing OIDs from it.
+    """
+    def __init__(self, limit=64, timeout=1.0, retries=1, deadline=None, community='public', version=1,
+                 user=None, auth=None, priv=None, policy=None, registry=metrics, cache=None):
+        self.limit = limit
+        self.timeout = timeout
+        self.retries = retries
+        self.deadline = deadline  # Upper bound for a whole job against one target
+        self.community = community
+        self.version = version
+        self.credentials = (user, auth, priv)  # Used by targets with version 3
+        self.policy = policy
+        self.registry = registry
+        self.cache = cache
+        # One engine for the poller's loop, whichever thread runs it, or one per request thread
+        self.pool = SessionPool(transport_factory=UdpTransportTarget, per_thread=not ASYNCIO_CARRIER)
+        # Each request thread boots its engine as it starts, see _start_threads
+        self._executor = None if ASYNCIO_CARRIER else ThreadPoolExecutor(limit, initializer=self.pool.engine)
+        self._threads_started = ASYNCIO_CARRIER
+        self._targets = {}  # (ip, port) -> Target for the jobs in flight
+        self._polls = 0
+
+    def session(self, ip, port):
+        target = self._targets.get((ip, port)) or Target(ip, port)
+        credentials = self.credentials if target.user is None else (target.user, target.auth, target.priv)
+        return self.pool.session(ip, port,
+                                 self.community if target.community is None else target.community,
+                                 self.version if target.version is None else target.version,
+                                 credentials,
+                                 timeout=self.timeout if target.timeout is None else target.timeout,
+                                 retries=self.retries if target.retries is None else target.retries)
+
+    async def _request(self, command, session, *varBinds):
+        key = session.key[:2]
+        target = self._targets.get(key)
+        if self.policy is not None and (target is None or target.timeout is None):
+            session.transport.timeout = self.policy.timeout(key)
+            session.transport.retries = self.policy.retries(key)
+        try:
+            response, rtt = await self._send(command, session, varBinds)
+        except Exception as e:
+            self.registry.count_error("exception", type(e).__name__)
+            raise
+        self.registry.observe_request(key, command.__name__, rtt, response[0], response[1])
+        if self.policy is not None:
+            if response[0]:
+                self.policy.record_failure(key)
+            else:
+                self.policy.record_success(key, rtt, session.transport.timeout)
+        return response
+
+    async def _send(self, command, session, varBinds):
+        """
+        Send one request and return (response, round-trip time in seconds).
+        """
+        if ASYNCIO_CARRIER:
+            started = time.monotonic()
+            response = await command(self.pool.engine(), session.auth, session.transport, session.context,
+                                     *varBinds, lookupMib=False)
+            return response, time.monotonic() - started
+        # Timed in the request thread, so waiting for a free thread does not count as latency
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._send_blocking,
+                                                                command, session, varBinds)
+
+    def _send_blocking(self, command, session, varBinds):
+        # One PDU per call: the callback returns None, so next and bulk do not carry on
+        engine = self.pool.engine()
+        response = []
+
+        def cbFun(snmpEngine, sendRequestHandle, errorIndication, errorStatus, errorIndex, varBinds, cbCtx):
+            response.extend((errorIndication, errorStatus, errorIndex, varBinds))
+
+        started = time.monotonic()
+        command(engine, session.auth, session.transport, session.context, *varBinds, cbFun=cbFun, lookupMib=False)
+        engine.transportDispatcher.runDispatcher()
+        return tuple(response), time.monotonic() - started
+
+    async def _start_threads(self):
+        # The executor only adds a thread when no idle one is left. Holding all
+        # `limit` of them at a barrier starts every thread, and with it every
+        # engine, before the first request instead of during the first sweeps.
+        self._threads_started = True
+        barrier = threading.Barrier(self.limit)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self._executor, barrier.wait) for _ in range(self.limit)])
+
+    async def get_many(self, ip, port, oids, max_varbinds=MAX_VARBINDS):
+        """
+        Asynchronous snmp_get_many: returns a dict of OID -> value, or None on timeout.
+        """
+        oids = list(oids)
+        if self.cache is None:
+            return await self._get_many(ip, port, oids, max_varbinds)
+
+        key = (ip, port)
+        cached, missing = self.cache.split(key, oids)
+        # Cached values are only served alongside a fresh sysUpTime, which tells a reboot apart
+        wire = missing + [SYS_UPTIME_OID] if cached and SYS_UPTIME_OID not in missing else missing
+        values = await self._get_many(ip, port, wire, max_varbinds) if wire else {}
+        if values is None:
+            return None
+        if self.cache.observe_uptime(key, values.get(SYS_UPTIME_OID)) and cached:
+            refetched = await self._get_many(ip, port, list(cached), max_varbinds)
+            if refetched is None:
+                return None
+            values.update(refetched)
+            cached = {}
+        self.cache.update(key, values)
+        values.update(cached)
+        return {oid: values.get(oid) for oid in oids}
+
+    async def _get_many(self, ip, port, oids, max_varbinds):
+        session = self.session(ip, port)
+        results = {}
+        pending = split_oids(oids, max_varbinds)
+        while pending:
+            chunk = pending.pop()
+            errorIndication, errorStatus, errorIndex, varBinds = await self._request(
+                getCmd, session, *[self.pool.object_type(oid) for oid in chunk])
+            if errorIndication:
+                return None
+            apply_response(chunk, pending, results, errorStatus, errorIndex, varBinds)
+        return {oid: results.get(oid) for oid in oids}
+
+    async def walk_table(self, ip, port, columns, max_repetitions=MAX_REPETITIONS):
+        """
+        Asynchronous walk_table: walks the columns together (GETBULK, or GETNEXT
+        for SNMPv1) and returns a dict of row index -> {column name: value}.
+        """
+        session = self.session(ip, port)
+        columns = [(column, ObjectName(oid)) for column, oid in columns.items()]
+        varBinds = [self.pool.object_type(str(base)) for _, base in columns]
+        records = {}
+        while columns:
+            if session.version == 0:
+                errorIndication, errorStatus, errorIndex, varBindTable = await self._request(
+                    nextCmd, session, *varBinds)
+            else:
+                errorIndication, errorStatus, errorIndex, varBindTable = await self._request(
+                    bulkCmd, session, 0, max_repetitions, *varBinds)
+            if errorIndication:
+                return None
+            if errorStatus or not varBindTable:
+                break
+            last = merge_table_rows(columns, varBindTable, records)
+            # Only columns that are still inside their subtree go into the next request
+            columns = [(column, base) for column, base in columns if column in last]
+            varBinds = [self.pool.resolve(last[column]) for column, _ in columns]
+        return records
+
+    async def walk(self, ip, port, root, callback, start=None, stop=None, max_repetitions=MAX_REPETITIONS):
+        """
+        Walk the subtree `root` with GETBULK (GETNEXT for SNMPv1), handing each
+        response's [(OID, value), ...] to `callback` instead of collecting them.
+
+        Only OIDs after `start` and before `stop` (OID strings, default the
+        whole subtree) are walked, so one subtree can be split into ranges that
+        are walked side by side. `start` itself is not walked, so it should
+        be a group rather than an instance. Returns the number of varbinds walked, or None
+        if the agent stopped answering.
+        """
+        session = self.session(ip, port)
+        base = ObjectName(root)
+        end = tuple(ObjectName(stop)) if stop is not None else None
+        last = ObjectName(start or root)
+        walked = 0
+        while True:
+            varBind = self.pool.resolve(last)
+            if session.version == 0:
+                errorIndication, errorStatus, errorIndex, varBindTable = await self._request(
+                    nextCmd, session, varBind)
+            else:
+                errorIndication, errorStatus, errorIndex, varBindTable = await self._request(
+                    bulkCmd, session, 0, max_repetitions, varBind)
+            if errorIndication:
+                return None
+            if errorStatus or not varBindTable:
+                return walked
+            rows, done = [], False
+            for varBindRow in varBindTable:
+                name, value = varBindRow[0]
+                if (isinstance(value, EndOfMibView) or not base.isPrefixOf(name)
+                        or (end is not None and tuple(name) >= end)):
+                    done = True
+                    break
+                if tuple(name) <= tuple(last):
+                    # The agent went backwards, walking on would loop forever
+                    self.registry.count_error("walk", "oidNotIncreasing")
+                    done = True
+                    break
+                rows.append((str(name), decode_value(value)))
+                last = name
+            if rows:
+                callback(rows)
+                walked += len(rows)
+            if done:
+                return walked
+
+    async def poll(self, targets, job):
+        """
+        Run `await job(poller, ip, port)` for every Target (or plain (ip, port)
+        pair) in `targets`, at most `limit` at a time, and yield
+        (ip, port, result) as each one completes.
+
+        `targets` is consumed lazily, so an Inventory streams straight in. A job
+        that fails, runs past `deadline` or is skipped because its agent is
+        quarantined yields None as its result; the first failure of each
+        exception type is printed to stderr, all are counted in `registry`.
+        An exception raised while iterating `targets` is re-raised once the
+        targets already taken have been polled.
+        """
+        targets = iter(targets)
+        results = asyncio.Queue()
+        failures = set()  # Exception types already reported
+        errors = []  # Raised by `targets` itself
+
+        async def worker():
+            try:
+                # Workers share the iterator, so each one pulls the next free target
+                for target in targets:
+                    target = target if isinstance(target, Target) else Target(*target)
+                    ip, port = target.ip, target.port
+                    if self.policy is not None and not self.policy.should_poll((ip, port)):
+                        self.registry.count_error("quarantine", "skipped")
+                        await results.put((ip, port, None))
+                        continue
+                    self._targets[(ip, port)] = target
+                    self.registry.track_in_flight(1)
+                    try:
+                        result = await asyncio.wait_for(job(self, ip, port), self.deadline)
+                    except Exception as e:
+                        self.registry.count_error("job", type(e).__name__)
+                        # Past the deadline is an expected outcome, a bug in the job is reported once per type
+                        if not isinstance(e, asyncio.TimeoutError) and type(e) not in failures:
+                            failures.add(type(e))
+                            print(f"Job failed for {ip}:{port}: {type(e).__name__}: {e}", file=sys.stderr)
+                        result = None
+                    finally:
+                        self._targets.pop((ip, port), None)
+                        self.registry.track_in_flight(-1)
+                    await results.put((ip, port, result))
+            except Exception as e:
+                # A malformed target or a failing inventory source, raised once the other workers are done
+                errors.append(e)
+            finally:
+                await results.put(None)
+
+        if not self._polls:
+            # Nothing is in flight between sweeps, so the engine can drop stale targets
+            self.pool.prune()
+        if not self._threads_started:
+            await self._start_threads()
+        self._polls += 1
+        started = time.monotonic()
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.limit)]
+        remaining = len(workers)
+        try:
+            while remaining:
+                item = await results.get()
+                if item is None:
+                    remaining -= 1
+                else:
+                    yield item
+            if errors:
+                raise errors[0]
+            self.registry.observe_sweep(time.monotonic() - started)
+        finally:
+            self._polls -= 1
+            for task in workers:
+                task.cancel()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+        self.pool.close()
+
+
+def close_loop(loop):
+    """
+    Close `loop` once the tasks still pending on it, such as the timer task
+    of pysnmp's asyncio dispatcher, have been cancelled and run to their end.
+    """
+    tasks = asyncio.all_tasks(loop)
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+    loop.close()
+
+
+def iterate(loop, results):
+    """
+    Drive the async generator `results` on `loop` from synchronous code.
+    """
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(results.aclose())
+
+
+class Sweeper:
+    """
+    One event loop and AsyncPoller kept for many sweeps from synchronous code.
+
+    The poller's engine remembers every SNMPv3 agent's engine ID, clock and
+    localized keys, so repeated sweeps skip discovery; sessions and the
+    policy's RTTs carry over too. Same interface as ShardedSweeper.
+    """
+    def __init__(self, **options):
+        self.loop = asyncio.new_event_loop()
+        self.poller = AsyncPoller(**options)
+
+    def sweep(self, targets, job):
+        return iterate(self.loop, self.poller.poll(targets, job))
+
+    def close(self):
+        self.poller.close()
+        close_loop(self.loop)
+
+
+def sweep(targets, job, **options):
+    """
+    Poll `targets` concurrently from synchronous code, yielding (ip, port, result)
+    as results arrive. `options` are passed to AsyncPoller.
+    """
+    sweeper = Sweeper(**options)
+    try:
+        yield from sweeper.sweep(targets, job)
+    finally:
+        sweeper.close()
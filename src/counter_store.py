@@ -0,0 +1,196 @@
+import sqlite3
+import time
+
+
+# Bucket width in seconds for each rollup tier
+TIERS = (("1m", 60), ("1h", 3600))
+
+# Seconds of history kept per tier
+DEFAULT_RETENTION = {
+    "raw": 2 * 86400,
+    "1m": 30 * 86400,
+    "1h": 2 * 365 * 86400,
+}
+
+
+
+class CounterStore:
+    """
+    SQLite time-series store for ifInOctets/ifOutOctets samples.
+
+    Samples are buffered and written in batches. Every flush rolls the touched
+    buckets up into the 1-minute and 1-hour tiers, and each tier is pruned to
+    its own retention. A bucket keeps its last sample (time, counters and
+    counter width) rather than min/max, which mean nothing once a counter
+    wraps or the agent reboots; rates between buckets come from
+    rates.counter_rates like any other readings. All tables are keyed by
+    (series, ts) without a rowid, so range queries are a single index seek.
+    """
+    def __init__(self, db_name="counters.db", batch_size=500, flush_interval=30,
+                 retention=None, prune_interval=600):
+        self.db_name = db_name
+        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention = dict(DEFAULT_RETENTION, **(retention or {}))
+        self.prune_interval = prune_interval
+        self._buffer = []
+        self._series = {}
+        self._last_flush = time.monotonic()
+        self._last_prune = 0
+        self.create_tables()
+
+    def create_tables(self):
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS series (
+            id INTEGER PRIMARY KEY,
+            ip TEXT NOT NULL,
+            port INTEGER NOT NULL,
+            ifIndex INTEGER NOT NULL,
+            UNIQUE(ip, port, ifIndex)
+        )
+        """)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS samples (
+            series INTEGER NOT NULL,
+            ts INTEGER NOT NULL,
+            rx INTEGER,
+            tx INTEGER,
+            width INTEGER,
+            PRIMARY KEY (series, ts)
+        ) WITHOUT ROWID
+        """)
+        if "width" not in self._columns("samples"):
+            # Stores from before the counter width was kept; NULL marks it unknown
+            self.conn.execute("ALTER TABLE samples ADD COLUMN width INTEGER")
+        for tier, _ in TIERS:
+            self.conn.execute(self.TIER_SCHEMA.format(table=f"samples_{tier}"))
+            if "rx_min" in self._columns(f"samples_{tier}"):
+                self.migrate_tier(tier)
+        self.conn.commit()
+
+    # One row per bucket: the number of samples and the last one of them
+    TIER_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS {table} (
+            series INTEGER NOT NULL,
+            ts INTEGER NOT NULL,
+            n INTEGER,
+            last_ts INTEGER,
+            rx INTEGER,
+            tx INTEGER,
+            width INTEGER,
+            PRIMARY KEY (series, ts)
+        ) WITHOUT ROWID
+        """
+
+    def _columns(self, table):
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+
+    def migrate_tier(self, tier):
+        """
+        Rebuild a tier from before buckets kept their last sample. The old
+        maxima become the last values, which holds for buckets without a wrap.
+        """
+        with self.conn:
+            self.conn.execute(self.TIER_SCHEMA.format(table="samples_migrated"))
+            self.conn.execute(f"""
+            INSERT INTO samples_migrated (series, ts, n, last_ts, rx, tx, width)
+            SELECT series, ts, n, ts, rx_max, tx_max, NULL FROM samples_{tier}
+            """)
+            self.conn.execute(f"DROP TABLE samples_{tier}")
+            self.conn.execute(f"ALTER TABLE samples_migrated RENAME TO samples_{tier}")
+
+    def series_id(self, ip, port, if_index):
+        key = (ip, port, if_index)
+        series = self._series.get(key)
+        if series is None:
+            self.conn.execute("INSERT OR IGNORE INTO series (ip, port, ifIndex) VALUES (?, ?, ?)", key)
+            series = self.conn.execute("SELECT id FROM series WHERE ip=? AND port=? AND ifIndex=?", key).fetchone()[0]
+            self._series[key] = series
+        return series
+
+    def record(self, ip, port, if_index, rx, tx, ts=None, width=64):
+        """
+        Buffer one counter sample from `width`-bit counters (32 for ifInOctets,
+        64 for ifHCInOctets); the buffer is flushed once it is full or stale.
+        """
+        ts = int(time.time() if ts is None else ts)
+        self._buffer.append((self.series_id(ip, port, if_index), ts, rx, tx, width))
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            self.conn.commit()
+            return
+        batch, self._buffer = self._buffer, []
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO samples (series, ts, rx, tx, width) VALUES (?, ?, ?, ?, ?)", batch)
+            self._roll_up(batch)
+        if time.time() - self._last_prune >= self.prune_interval:
+            self.prune()
+
+    def _roll_up(self, batch):
+        # Buckets touched by the batch are recomputed, so late samples and the
+        # still-open current bucket are always reflected
+        spans = {}
+        for series, ts, _, _, _ in batch:
+            first, last = spans.get(series, (ts, ts))
+            spans[series] = (min(first, ts), max(last, ts))
+        # With a single MAX() aggregate, SQLite takes the bare columns from the row holding the maximum
+        source, aggregates = "samples", "COUNT(*), MAX(ts), rx, tx, width"
+        for tier, width in TIERS:
+            self.conn.executemany(f"""
+            INSERT OR REPLACE INTO samples_{tier} (series, ts, n, last_ts, rx, tx, width)
+            SELECT series, ts - ts % {width}, {aggregates}
+            FROM {source} WHERE series = ? AND ts >= ? AND ts <= ?
+            GROUP BY series, ts - ts % {width}
+            """, [(series, first - first % width, last) for series, (first, last) in spans.items()])
+            source, aggregates = f"samples_{tier}", "SUM(n), MAX(last_ts), rx, tx, width"
+
+    def prune(self, now=None):
+        """
+        Delete rows older than each tier's retention.
+        """
+        now = time.time() if now is None else now
+        self._last_prune = now
+        series_ids = [row[0] for row in self.conn.execute("SELECT id FROM series")]
+        with self.conn:
+            for table, tier in (("samples", "raw"),) + tuple((f"samples_{tier}", tier) for tier, _ in TIERS):
+                cutoff = int(now - self.retention[tier])
+                # Per-series deletes stay on the (series, ts) primary key
+                self.conn.executemany(f"DELETE FROM {table} WHERE series=? AND ts<?",
+                                      [(series, cutoff) for series in series_ids])
+
+    def query(self, ip, port, if_index, start, end, resolution=None):
+        """
+        Return (ts, rx, tx, width) rows for one interface between `start` and `end`.
+
+        `resolution` is "raw", "1m" or "1h"; by default the finest tier whose
+        retention still covers `start` is used. Rolled-up rows are the last
+        sample of each bucket, so every row is a real reading that can go
+        straight into rates.counter_rates (width None: not recorded).
+        """
+        self.flush()
+        series = self._series.get((ip, port, if_index))
+        if series is None:
+            row = self.conn.execute("SELECT id FROM series WHERE ip=? AND port=? AND ifIndex=?",
+                                    (ip, port, if_index)).fetchone()
+            if row is None:
+                return []
+            series = row[0]
+        if resolution is None:
+            age = time.time() - start
+            tiers = ("raw",) + tuple(tier for tier, _ in TIERS)
+            resolution = next((tier for tier in tiers if age <= self.retention[tier]), tiers[-1])
+        if resolution == "raw":
+            query = "SELECT ts, rx, tx, width FROM samples WHERE series=? AND ts>=? AND ts<=? ORDER BY ts"
+        else:
+            query = (f"SELECT last_ts, rx, tx, width FROM samples_{resolution} "
+                     "WHERE series=? AND ts>=? AND ts<=? ORDER BY ts")
+        return self.conn.execute(query, (series, int(start), int(end))).fetchall()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
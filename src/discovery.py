@@ -0,0 +1,96 @@
+import asyncio
+from snmp_client import IF_TABLE_COLUMNS
+
+
+# System group scalars read by discovery
+SYSTEM_OIDS = {
+    "sysDescr": '1.3.6.1.2.1.1.1.0',
+    "sysObjectID": '1.3.6.1.2.1.1.2.0',
+    "sysUpTime": '1.3.6.1.2.1.1.3.0',
+    "sysContact": '1.3.6.1.2.1.1.4.0',
+    "sysName": '1.3.6.1.2.1.1.5.0',
+    "sysLocation": '1.3.6.1.2.1.1.6.0',
+}
+
+# Scalars kept in the hosts table
+HOST_OIDS = {key: SYSTEM_OIDS[key] for key in ("sysDescr", "sysName", "sysUpTime", "sysLocation")}
+
+MAC_OID_BASE = '1.3.6.1.2.1.2.2.1.6'  # OID for ifPhysAddress (MAC)
+
+MIB2_OID = '1.3.6.1.2.1'
+
+# Where full walks split a subtree into ranges that are walked side by side. mib-2
+# splits at its big groups (interfaces, ip, tcp, host, ifMIB, ...). The arcs
+# must be groups: a range walks the OIDs after its start, so an instance
+# (such as row 2 of a table column) at a bound would be skipped. Other
+# subtrees are walked as a single chain.
+SPLIT_ARCS = {MIB2_OID: (2, 3, 4, 5, 6, 7, 10, 11, 25, 31, 47)}
+
+# Ranges walked at once against one agent
+WALK_WINDOW = 4
+
+
+# Sweep jobs live at module level so a process pool can pickle them
+
+async def discover_device(poller, ip, port):
+    """
+    Interfaces, their MAC addresses and the system scalars of one device, or
+    None when it reports no interfaces.
+    """
+    table = await poller.walk_table(ip, port, {"ifIndex": IF_TABLE_COLUMNS["ifIndex"]})
+    interfaces = [index for index in sorted(table or {}) if index != 1]
+    if not interfaces:
+        return None
+    # MACs are fetched with the scalars rather than walked, so a ResultCache can serve them too
+    mac_oids = {index: f"{MAC_OID_BASE}.{index}" for index in interfaces}
+    values = await poller.get_many(ip, port, list(mac_oids.values()) + list(SYSTEM_OIDS.values())) or {}
+    mac_addresses = {index: values.get(oid) for index, oid in mac_oids.items()}
+    return interfaces, mac_addresses, values
+
+
+async def query_host(poller, ip, port):
+    return await poller.get_many(ip, port, HOST_OIDS.values())
+
+
+async def get_scalars(poller, ip, port, oids):
+    return await poller.get_many(ip, port, oids)
+
+
+async def walk_subtree(poller, ip, port, oid):
+    """
+    [(OID, value), ...] for everything under `oid`, in OID order.
+    """
+    rows = []
+    if await poller.walk(ip, port, oid, rows.extend) is None:
+        return None
+    return rows
+
+
+def split_subtree(root, arcs=None):
+    """
+    Cut `root` into contiguous (start, stop) ranges at child `arcs` (by
+    default its SPLIT_ARCS, if any); together they cover the whole subtree.
+    start None is the root itself, stop None its end.
+    """
+    arcs = SPLIT_ARCS.get(root, ()) if arcs is None else arcs
+    bounds = [f"{root}.{arc}" for arc in sorted(arcs)]
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+async def walk_subtrees(poller, ip, port, roots, sink, window=WALK_WINDOW):
+    """
+    Walk every subtree in `roots`, keeping up to `window` GETBULK chains in
+    flight against the agent, and pass each response to
+    sink(ip, port, root, rows) as [(OID, value), ...] so nothing is held
+    beyond one response. Ranges complete in any order. Returns the number of
+    varbinds walked, or None if the agent stopped answering part way.
+    """
+    slots = asyncio.Semaphore(window)
+
+    async def walk_range(root, start, stop):
+        async with slots:
+            return await poller.walk(ip, port, root, lambda rows: sink(ip, port, root, rows), start, stop)
+
+    counts = await asyncio.gather(*[walk_range(root, start, stop)
+                                    for root in roots for start, stop in split_subtree(root)])
+    return None if None in counts else sum(counts)
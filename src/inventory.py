@@ -0,0 +1,153 @@
+import ipaddress
+import itertools
+import os
+import sqlite3
+from collections import namedtuple
+
+
+# Settings left as None fall back to the poller's defaults. user, auth and
+# priv are the SNMPv3 (version 3) credentials, auth and priv as "protocol:passphrase"
+Target = namedtuple("Target", ["ip", "port", "community", "version", "timeout", "retries", "user", "auth", "priv"],
+                    defaults=[None] * 7)
+
+# Read by load_inventory when present, one target spec per line
+INVENTORY_FILE = "targets.txt"
+
+OPTION_TYPES = {"community": str, "version": int, "timeout": float, "retries": int,
+                "user": str, "auth": str, "priv": str}
+
+
+
+def parse_ports(text):
+    """
+    Parse "161", "16101-16160" or "161,16101-16105" into a list of port ranges.
+    """
+    ranges = []
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        ranges.append(range(int(first), int(last or first) + 1))
+    return ranges
+
+
+def expand_hosts(text):
+    """
+    Lazily yield the addresses of "10.0.0.5", "10.0.0.0/24" or "10.0.0.10-10.0.0.50".
+    The text is parsed before returning, so a malformed one raises ValueError at once.
+    """
+    if '/' in text:
+        network = ipaddress.ip_network(text, strict=False)
+        addresses = network if network.num_addresses <= 2 else network.hosts()
+        return (str(address) for address in addresses)
+    if '-' in text:
+        first, last = (ipaddress.ip_address(part.strip()) for part in text.split('-', 1))
+        return (str(ipaddress.ip_address(value)) for value in range(int(first), int(last) + 1))
+    return iter([str(ipaddress.ip_address(text))])
+
+
+def parse_spec(spec):
+    """
+    Lazily expand one target spec: "hosts[:ports] [option=value ...]".
+
+    hosts is an address, a CIDR block or an address range; ports is a port, a
+    range or a comma separated list of both (default 161). Options set the
+    per-target community, version (0 = v1, 1 = v2c, 3 = v3), timeout and
+    retries, and for v3 the user, auth and priv keys, e.g.
+    "version=3 user=monitor auth=sha:secret1 priv=aes:secret2".
+    IPv6 addresses with a port are written in brackets, e.g. [::1]:161.
+    Only the expansion is lazy: a malformed spec raises ValueError right away.
+    """
+    address, *options = spec.split()
+    settings = {}
+    for option in options:
+        key, _, value = option.partition('=')
+        if key not in OPTION_TYPES:
+            raise ValueError(f"Unknown target option '{key}' in '{spec}'")
+        settings[key] = OPTION_TYPES[key](value)
+    if "priv" in settings and "auth" not in settings:
+        raise ValueError(f"Target option 'priv' needs 'auth' in '{spec}'")
+
+    if address.startswith('['):
+        hosts, _, ports = address[1:].partition(']')
+        ports = ports.lstrip(':')
+    elif address.count(':') == 1:
+        hosts, ports = address.split(':')
+    else:
+        hosts, ports = address, ''
+    port_ranges = parse_ports(ports) if ports else [range(161, 162)]
+    return (Target(ip, port, **settings)
+            for ip in expand_hosts(hosts) for port in itertools.chain.from_iterable(port_ranges))
+
+
+class Inventory:
+    """
+    A lazily expanded list of SNMP targets built from specs, files and the
+    hosts table. Iterating yields Target tuples without materialising them,
+    so even a /16 sweep streams straight into the poller.
+    """
+    def __init__(self, sources=()):
+        self.sources = list(sources)
+
+    @classmethod
+    def from_specs(cls, specs):
+        if isinstance(specs, str):
+            specs = [specs]
+        for spec in specs:
+            parse_spec(spec)  # Fail on a malformed spec now rather than midway through a sweep
+        return cls([lambda spec=spec: parse_spec(spec) for spec in specs])
+
+    @classmethod
+    def from_file(cls, path):
+        def read():
+            with open(path, encoding='utf-8') as file:
+                for line in file:
+                    line = line.split('#', 1)[0].strip()
+                    if line:
+                        yield from parse_spec(line)
+        return cls([read])
+
+    @classmethod
+    def from_database(cls, db_name="hosts.db"):
+        def read():
+            conn = sqlite3.connect(db_name)
+            try:
+                for ip, port in conn.execute("SELECT ip, port FROM hosts ORDER BY id"):
+                    yield Target(ip, port)
+            finally:
+                conn.close()
+        return cls([read])
+
+    def __add__(self, other):
+        return Inventory(self.sources + other.sources)
+
+    def __iter__(self):
+        for source in self.sources:
+            yield from source()
+
+
+def find_target(targets, ip, port):
+    """
+    The first Target in `targets` for ip:port, or a Target without settings.
+    """
+    for target in targets:
+        if target.ip == ip and target.port == port:
+            return target
+    return Target(ip, port)
+
+
+def snmp_settings(target, community='public', version=1):
+    """
+    Keyword arguments for the snmp_client functions: the target's community,
+    version and SNMPv3 credentials, or the given defaults.
+    """
+    return {"community": community if target.community is None else target.community,
+            "version": version if target.version is None else target.version,
+            "credentials": None if target.user is None else (target.user, target.auth, target.priv)}
+
+
+def load_inventory(default_spec, path=INVENTORY_FILE):
+    """
+    Targets from `path` if that file exists, otherwise from `default_spec`.
+    """
+    if os.path.exists(path):
+        return Inventory.from_file(path)
+    return Inventory.from_specs(default_spec)
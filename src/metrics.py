@@ -0,0 +1,222 @@
+import bisect
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Upper bounds in seconds of the histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SWEEP_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        for position, count in enumerate(other.counts):
+            self.counts[position] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def cumulative(self):
+        total, counts = 0, []
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class Metrics:
+    """
+    Poll-level counters: per-target request latency histograms, requests by
+    command, errors by errorIndication / errorStatus / exception, sweep
+    durations and the number of jobs in flight.
+
+    Observing is a dict lookup and a bisect under one lock, so it can stay on
+    the hot path. Read it with snapshot() or render_prometheus(), or serve both
+    over HTTP with serve_metrics().
+    """
+    def __init__(self, latency_buckets=LATENCY_BUCKETS, sweep_buckets=SWEEP_BUCKETS):
+        self.latency_buckets = latency_buckets
+        self.sweep_buckets = sweep_buckets
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.reset()
+
+    def reset(self):
+        self.latency = {}  # (ip, port) -> Histogram of request round trips
+        self.requests = {}  # command -> requests sent
+        self.errors = {}  # (kind, reason) -> occurrences
+        self.sweeps = Histogram(self.sweep_buckets)
+        self.last_sweep = None
+
+    def observe_request(self, target, command, seconds, errorIndication=None, errorStatus=None):
+        with self._lock:
+            histogram = self.latency.get(target)
+            if histogram is None:
+                histogram = self.latency[target] = Histogram(self.latency_buckets)
+            histogram.observe(seconds)
+            self.requests[command] = self.requests.get(command, 0) + 1
+            if errorIndication:
+                # Indications are classes such as RequestTimedOut
+                self._count_error("errorIndication", type(errorIndication).__name__)
+            elif errorStatus:
+                self._count_error("errorStatus", errorStatus.prettyPrint() if hasattr(errorStatus, "prettyPrint")
+                                  else str(errorStatus))
+
+    def _count_error(self, kind, reason):
+        key = (kind, reason)
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    def count_error(self, kind, reason):
+        with self._lock:
+            self._count_error(kind, reason)
+
+    def track_in_flight(self, delta):
+        with self._lock:
+            self.in_flight += delta
+
+    def observe_sweep(self, seconds):
+        with self._lock:
+            self.sweeps.observe(seconds)
+            self.last_sweep = seconds
+
+    def drain(self):
+        """
+        Return the request and error metrics and start over, for shipping them
+        from a worker process to merge() in the parent.
+        """
+        with self._lock:
+            state = (self.latency, self.requests, self.errors)
+            self.latency, self.requests, self.errors = {}, {}, {}
+        return state
+
+    def merge(self, state):
+        latency, requests, errors = state
+        with self._lock:
+            for target, histogram in latency.items():
+                if target in self.latency:
+                    self.latency[target].merge(histogram)
+                else:
+                    self.latency[target] = histogram
+            for command, count in requests.items():
+                self.requests[command] = self.requests.get(command, 0) + count
+            for key, count in errors.items():
+                self.errors[key] = self.errors.get(key, 0) + count
+
+    def snapshot(self):
+        """
+        The current values as plain dicts, for a stats API or JSON dump.
+        """
+        with self._lock:
+            overall = Histogram(self.latency_buckets)
+            for histogram in self.latency.values():
+                overall.merge(histogram)
+            return {
+                "requests": dict(self.requests),
+                "errors": {f"{kind}:{reason}": count for (kind, reason), count in self.errors.items()},
+                "latency": {"buckets": list(self.latency_buckets), "counts": overall.counts,
+                            "sum": overall.sum, "count": overall.count},
+                "targets": len(self.latency),
+                "sweeps": self.sweeps.count,
+                "last_sweep_seconds": self.last_sweep,
+                "in_flight": self.in_flight,
+            }
+
+    def render_prometheus(self, per_target=True):
+        """
+        Prometheus text exposition format. Per-target histograms can be left
+        out for very large inventories; the overall histogram is always there.
+        """
+        lines = []
+
+        def histogram_lines(name, histogram, labels=""):
+            separator = "," if labels else ""
+            for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.cumulative()):
+                lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {count}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {histogram.sum}")
+            lines.append(f"{name}_count{suffix} {histogram.count}")
+
+        with self._lock:
+            lines.append("# HELP snmp_requests_total SNMP requests sent, by command.")
+            lines.append("# TYPE snmp_requests_total counter")
+            for command, count in sorted(self.requests.items()):
+                lines.append(f'snmp_requests_total{{command="{escape(command)}"}} {count}')
+
+            lines.append("# HELP snmp_errors_total Failed requests and jobs, by kind and reason.")
+            lines.append("# TYPE snmp_errors_total counter")
+            for (kind, reason), count in sorted(self.errors.items()):
+                lines.append(f'snmp_errors_total{{kind="{escape(kind)}",reason="{escape(reason)}"}} {count}')
+
+            overall = Histogram(self.latency_buckets)
+            for histogram in self.latency.values():
+                overall.merge(histogram)
+            lines.append("# HELP snmp_request_seconds Request round-trip time over all targets.")
+            lines.append("# TYPE snmp_request_seconds histogram")
+            histogram_lines("snmp_request_seconds", overall)
+            if per_target:
+                lines.append("# HELP snmp_target_request_seconds Request round-trip time per target.")
+                lines.append("# TYPE snmp_target_request_seconds histogram")
+                for (ip, port), histogram in sorted(self.latency.items()):
+                    histogram_lines("snmp_target_request_seconds", histogram,
+                                    f'target="{escape(ip)}:{port}"')
+
+            lines.append("# HELP snmp_sweep_seconds Duration of whole sweeps.")
+            lines.append("# TYPE snmp_sweep_seconds histogram")
+            histogram_lines("snmp_sweep_seconds", self.sweeps)
+
+            lines.append("# HELP snmp_jobs_in_flight Jobs currently waiting on an agent.")
+            lines.append("# TYPE snmp_jobs_in_flight gauge")
+            lines.append(f"snmp_jobs_in_flight {self.in_flight}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by the pollers and clients of this process
+metrics = Metrics()
+
+
+def serve_metrics(port, registry=metrics, host='', per_target=True):
+    """
+    Serve /metrics (Prometheus text) and /stats (JSON) from a daemon thread.
+    Returns the server; call shutdown() on it to stop.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = registry.render_prometheus(per_target).encode()
+                content_type = "text/plain; version=0.0.4"
+            elif self.path == "/stats":
+                body = json.dumps(registry.snapshot()).encode()
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
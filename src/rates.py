@@ -0,0 +1,71 @@
+import numpy as np
+
+
+COUNTER32_MASK = np.uint64(0xFFFFFFFF)
+COUNTER64_MASK = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+
+def counter_rates(values, times, widths, valid=None, uptimes=None):
+    """
+    Turn counter samples into per-second rates for many counters at once.
+
+    values:  (samples, counters) raw counter readings
+    times:   (samples,) poll timestamps in seconds
+    widths:  (counters,) or (samples, counters) counter width, 32 or 64 bits
+    valid:   optional (samples, counters) mask of readings that were received
+    uptimes: optional (samples,) or (samples, counters) sysUpTime in ticks
+
+    Returns a (samples - 1, counters) float array. Deltas are taken modulo the
+    counter width, so Counter32/Counter64 wraps come out right; a rate is NaN
+    where either reading is missing, the width changed between samples, or
+    sysUpTime went backwards (the agent rebooted and its counters restarted).
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    times = np.asarray(times, dtype=np.float64)
+    widths = np.broadcast_to(np.asarray(widths), values.shape)
+
+    # uint64 subtraction wraps modulo 2**64; masking brings Counter32 down to 2**32
+    deltas = np.diff(values, axis=0)
+    deltas &= np.where(widths[1:] == 32, COUNTER32_MASK, COUNTER64_MASK)
+
+    elapsed = np.diff(times)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = deltas.astype(np.float64) / elapsed
+
+    broken = (widths[1:] != widths[:-1]) | (elapsed <= 0)
+    if valid is not None:
+        valid = np.asarray(valid, dtype=bool)
+        broken |= ~(valid[1:] & valid[:-1])
+    if uptimes is not None:
+        uptimes = np.asarray(uptimes, dtype=np.int64)
+        if uptimes.ndim == 1:
+            uptimes = uptimes[:, None]
+        broken |= np.diff(uptimes, axis=0) < 0
+    rates[broken] = np.nan
+    return rates
+
+
+class RateEngine:
+    """
+    Keeps the previous poll of a fixed set of counters and turns each new poll
+    into rates with counter_rates.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._last = None
+
+    def update(self, values, timestamp, widths, valid=None, uptime=None):
+        """
+        Feed one poll (arrays of length `size`) and return its rates, which are
+        all NaN for the first poll.
+        """
+        values = np.asarray(values, dtype=np.uint64)
+        widths = np.asarray(widths)
+        valid = np.ones(self.size, dtype=bool) if valid is None else np.asarray(valid, dtype=bool)
+        last, self._last = self._last, (values, timestamp, widths, valid, uptime)
+        if last is None:
+            return np.full(self.size, np.nan)
+        uptimes = None if last[4] is None or uptime is None else (last[4], uptime)
+        return counter_rates(np.stack([last[0], values]), (last[1], timestamp), np.stack([last[2], widths]),
+                             np.stack([last[3], valid]), uptimes)[0]
@@ -0,0 +1,112 @@
+import time
+from collections import OrderedDict
+
+
+SYS_UPTIME_OID = '1.3.6.1.2.1.1.3.0'
+
+# Seconds a value stays valid, by OID prefix; the longest matching prefix wins
+DEFAULT_TTLS = {
+    '1.3.6.1.2.1.1.1': 3600,  # sysDescr
+    '1.3.6.1.2.1.1.2': 86400,  # sysObjectID
+    '1.3.6.1.2.1.1.4': 3600,  # sysContact
+    '1.3.6.1.2.1.1.5': 600,  # sysName
+    '1.3.6.1.2.1.1.6': 3600,  # sysLocation
+    '1.3.6.1.2.1.2.2.1.6': 3600,  # ifPhysAddress
+}
+
+_MISSING = object()
+
+
+
+class ResultCache:
+    """
+    Remembers slow-changing values per agent so sweeps only put the volatile
+    OIDs on the wire.
+
+    Each OID class (prefix) has its own TTL; OIDs outside every class are
+    never cached. At most `max_entries` values are kept, least recently used
+    first out. An agent whose sysUpTime went backwards has rebooted, and all
+    of its cached values are dropped.
+    """
+    def __init__(self, ttls=None, max_entries=100000):
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (target, oid) -> (value, expires)
+        self._oids = {}  # target -> set of its cached OIDs
+        self._uptimes = {}  # target -> last sysUpTime in ticks
+        self._ttl_by_oid = {}
+        self.hits = 0
+        self.misses = 0
+
+    def ttl(self, oid):
+        ttl = self._ttl_by_oid.get(oid, _MISSING)
+        if ttl is _MISSING:
+            ttl = None
+            best = -1
+            for prefix, seconds in self.ttls.items():
+                if (oid == prefix or oid.startswith(prefix + '.')) and len(prefix) > best:
+                    ttl, best = seconds, len(prefix)
+            if len(self._ttl_by_oid) < self.max_entries:
+                self._ttl_by_oid[oid] = ttl
+        return ttl
+
+    def split(self, target, oids, now=None):
+        """
+        Return ({oid: cached value}, [oids that have to be fetched]).
+        """
+        now = time.monotonic() if now is None else now
+        cached, missing = {}, []
+        for oid in oids:
+            entry = self._entries.get((target, oid))
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end((target, oid))
+                cached[oid] = entry[0]
+                self.hits += 1
+            else:
+                missing.append(oid)
+                if self.ttl(oid) is not None:
+                    self.misses += 1
+        return cached, missing
+
+    def update(self, target, values, now=None):
+        """
+        Store the cacheable ones of freshly fetched {oid: value}.
+        """
+        now = time.monotonic() if now is None else now
+        for oid, value in values.items():
+            ttl = self.ttl(oid)
+            if ttl is None:
+                continue
+            self._entries[(target, oid)] = (value, now + ttl)
+            self._entries.move_to_end((target, oid))
+            self._oids.setdefault(target, set()).add(oid)
+        while len(self._entries) > self.max_entries:
+            (old_target, oid), _ = self._entries.popitem(last=False)
+            oids = self._oids.get(old_target)
+            if oids is not None:
+                oids.discard(oid)
+                if not oids:
+                    del self._oids[old_target]
+
+    def observe_uptime(self, target, uptime):
+        """
+        Feed a sysUpTime reading; returns True (and forgets the agent's cached
+        values) when it shows that the agent rebooted.
+        """
+        try:
+            uptime = int(uptime)
+        except (TypeError, ValueError):
+            return False
+        previous = self._uptimes.get(target)
+        self._uptimes[target] = uptime
+        if previous is None or uptime >= previous:
+            return False
+        self.invalidate(target)
+        return True
+
+    def invalidate(self, target):
+        for oid in self._oids.pop(target, ()):
+            self._entries.pop((target, oid), None)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,42 @@
+import numpy as np
+
+
+
+class RingBuffer:
+    """
+    Fixed-capacity, array-backed buffer of sample rows.
+
+    Appending is O(1) and never reallocates; once full, the oldest row is
+    overwritten. Memory is capacity * columns * itemsize bytes up front.
+    """
+    def __init__(self, capacity, columns, dtype=np.float64):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._data = np.empty((capacity, columns), dtype=dtype)
+        self._next = 0
+        self._count = 0
+
+    def append(self, row):
+        self._data[self._next] = row
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def values(self):
+        """
+        Return the stored rows, oldest first.
+        """
+        if self._count < self.capacity:
+            return self._data[:self._count]
+        return np.concatenate((self._data[self._next:], self._data[:self._next]))
+
+    def clear(self):
+        self._next = 0
+        self._count = 0
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def __len__(self):
+        return self._count
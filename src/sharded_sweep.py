@@ -0,0 +1,135 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+from async_poller import AsyncPoller, close_loop
+from inventory import Target
+from metrics import Metrics, metrics
+
+
+# Targets handed to a worker at a time
+SHARD_SIZE = 256
+
+
+
+def _worker(tasks, results, options):
+    # Each process owns its event loop, engine and sessions for its whole life
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    registry = Metrics()
+    poller = AsyncPoller(registry=registry, **options)
+
+    async def collect(targets, job):
+        return [item async for item in poller.poll(targets, job)]
+
+    try:
+        for task in iter(tasks.get, None):
+            if task == "done":
+                # The worker's request and error metrics ride along with the end of each sweep
+                results.put(("done", registry.drain()))
+            else:
+                job, targets = task
+                results.put(loop.run_until_complete(collect(targets, job)))
+    finally:
+        poller.close()
+        close_loop(loop)
+
+
+class ShardedSweeper:
+    """
+    Sweep very large inventories with a pool of worker processes, each running
+    its own AsyncPoller.
+
+    Targets are assigned to workers by hashing (ip, port), so an agent always
+    lands on the same worker and that worker's TimeoutPolicy keeps learning it
+    across sweeps. Results stream back to the calling process as each shard
+    finishes, so the caller stays the single writer. Jobs must be picklable,
+    i.e. module-level functions (see discovery.py). Workers are spawned, not
+    forked, so they start clean even when the caller runs Qt threads.
+    Worker metrics are merged into `registry` at the end of every sweep.
+    """
+    def __init__(self, processes=None, shard_size=SHARD_SIZE, registry=metrics, **options):
+        self.processes = processes or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.registry = registry
+        context = multiprocessing.get_context("spawn")
+        self.results = context.Queue()
+        self.tasks = []
+        self.workers = []
+        for _ in range(self.processes):
+            # A short task queue is enough to keep a worker busy and keeps the inventory lazy
+            tasks = context.Queue(maxsize=2)
+            worker = context.Process(target=_worker, args=(tasks, self.results, options), daemon=True)
+            worker.start()
+            self.tasks.append(tasks)
+            self.workers.append(worker)
+
+    def _get(self):
+        while True:
+            try:
+                return self.results.get(timeout=1)
+            except queue.Empty:
+                if not all(worker.is_alive() for worker in self.workers):
+                    raise RuntimeError("A sweep worker process died")
+
+    def _drain(self):
+        while True:
+            try:
+                item = self.results.get_nowait()
+            except queue.Empty:
+                return
+            yield item
+
+    def sweep(self, targets, job):
+        """
+        Like async_poller.sweep: yield (ip, port, result) for every target.
+        """
+        started = time.monotonic()
+        shards = [[] for _ in self.workers]
+        for target in targets:
+            target = target if isinstance(target, Target) else Target(*target)
+            number = hash((target.ip, target.port)) % self.processes
+            shard = shards[number]
+            shard.append(target)
+            if len(shard) >= self.shard_size:
+                self.tasks[number].put((job, shard))
+                shards[number] = []
+                # Hand back whatever has finished meanwhile instead of letting it pile up
+                for item in self._drain():
+                    yield from item
+
+        for number, shard in enumerate(shards):
+            if shard:
+                self.tasks[number].put((job, shard))
+            self.tasks[number].put("done")
+
+        remaining = self.processes
+        while remaining:
+            item = self._get()
+            if isinstance(item, tuple):
+                self.registry.merge(item[1])
+                remaining -= 1
+            else:
+                yield from item
+        self.registry.observe_sweep(time.monotonic() - started)
+
+    def close(self):
+        for tasks in self.tasks:
+            tasks.put(None)
+        for worker in self.workers:
+            worker.join(5)
+            if worker.is_alive():
+                worker.terminate()
+
+
+def sharded_sweep(targets, job, processes=None, shard_size=SHARD_SIZE, registry=metrics, **options):
+    """
+    One-off sharded sweep: start `processes` workers, sweep `targets` and stop
+    them again. `options` are passed to each worker's AsyncPoller.
+    """
+    sweeper = ShardedSweeper(processes, shard_size, registry, **options)
+    try:
+        yield from sweeper.sweep(targets, job)
+    finally:
+        sweeper.close()
@@ -0,0 +1,67 @@
+"""
+Walk snapshots: gzip-compressed NDJSON, one line per walk response.
+
+Each line is a block of columns for one agent and subtree,
+
+    {"ip": "10.0.0.5", "port": 161, "root": "1.3.6.1.2.1", "oids": ["2.2.1.10.1", ...], "values": [123, ...]}
+
+with the OIDs relative to the root. Blocks are written as responses arrive,
+so a snapshot of millions of varbinds never has to fit in memory, and blocks
+of different agents and ranges interleave. Values are the decoded ones from
+snmp_values; bytes are stored as {"hex": "001a2b"} so that they read back as
+bytes rather than as a string that happens to start with 0x.
+"""
+import gzip
+import json
+
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return {"hex": value.hex()}
+    raise TypeError(f"Cannot store {type(value).__name__} in a snapshot")
+
+
+def _decode(value):
+    return bytes.fromhex(value["hex"]) if isinstance(value, dict) else value
+
+
+
+class SnapshotWriter:
+    def __init__(self, path, compresslevel=6):
+        self.file = gzip.open(path, "wt", encoding="utf-8", compresslevel=compresslevel)
+        self.blocks = 0
+        self.varbinds = 0
+
+    def write(self, ip, port, root, rows):
+        """
+        Append one response's [(OID, value), ...] from the subtree `root`.
+        """
+        if not rows:
+            return
+        skip = len(root) + 1
+        block = {"ip": ip, "port": port, "root": root,
+                 "oids": [oid[skip:] for oid, _ in rows], "values": [value for _, value in rows]}
+        self.file.write(json.dumps(block, separators=(',', ':'), default=_encode) + "\n")
+        self.blocks += 1
+        self.varbinds += len(rows)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_snapshot(path):
+    """
+    Lazily yield (ip, port, OID, value) from a snapshot, block by block.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            block = json.loads(line)
+            prefix = block["root"] + '.'
+            for oid, value in zip(block["oids"], block["values"]):
+                yield block["ip"], block["port"], prefix + oid, _decode(value)
@@ -0,0 +1,167 @@
+import time
+from pysnmp.hlapi import getCmd, nextCmd, bulkCmd
+from pysnmp.proto.rfc1902 import ObjectName
+from pysnmp.proto.rfc1905 import EndOfMibView
+from snmp_session import session_pool
+from snmp_values import decode_value
+from metrics import metrics
+
+
+TOO_BIG = 1
+NO_SUCH_NAME = 2
+
+# Varbinds per GetRequest before the agent has a chance to answer tooBig
+MAX_VARBINDS = 32
+
+# Rows per GetBulkRequest when walking tables
+MAX_REPETITIONS = 25
+
+IF_TABLE_COLUMNS = {
+    "ifIndex": '1.3.6.1.2.1.2.2.1.1',
+    "ifDescr": '1.3.6.1.2.1.2.2.1.2',
+    "ifPhysAddress": '1.3.6.1.2.1.2.2.1.6',
+    "ifInOctets": '1.3.6.1.2.1.2.2.1.10',
+    "ifOutOctets": '1.3.6.1.2.1.2.2.1.16',
+}
+
+
+
+def snmp_get_many(ip, port, oids, community='public', version=1, max_varbinds=MAX_VARBINDS, pool=session_pool,
+                  registry=metrics, credentials=None):
+    """
+    Fetch many OIDs from one agent with as few GetRequest PDUs as possible.
+
+    Returns a dict of OID -> value decoded to int, str or bytes (None where the
+    agent has no value), or None if the agent did not answer. A PDU rejected
+    with tooBig is split in half and retried; an SNMPv1 noSuchName only drops
+    the offending OID.
+    Version 3 agents are queried with `credentials`, a (user, auth, priv) tuple.
+    """
+    oids = list(oids)
+    session = pool.session(ip, port, community, version, credentials)
+    engine = pool.engine()
+    results = {}
+    pending = split_oids(oids, max_varbinds)
+    while pending:
+        chunk = pending.pop()
+        started = time.monotonic()
+        try:
+            iterator = getCmd(engine,
+                              session.auth,
+                              session.transport,
+                              session.context,
+                              *[pool.object_type(oid) for oid in chunk],
+                              lookupMib=False)
+            errorIndication, errorStatus, errorIndex, varBinds = next(iterator)
+        except Exception as e:
+            registry.count_error("exception", type(e).__name__)
+            return None
+
+        registry.observe_request((ip, port), "getCmd", time.monotonic() - started, errorIndication, errorStatus)
+        if errorIndication:
+            return None
+        apply_response(chunk, pending, results, errorStatus, errorIndex, varBinds)
+    return {oid: results.get(oid) for oid in oids}
+
+
+def split_oids(oids, max_varbinds=MAX_VARBINDS):
+    return [oids[i:i + max_varbinds] for i in range(0, len(oids), max_varbinds)]
+
+
+def apply_response(chunk, pending, results, errorStatus, errorIndex, varBinds):
+    """
+    Record the answer to one GetRequest for `chunk` in `results`, pushing any
+    OIDs that still have to be re-requested back onto `pending`. An error the
+    agent does not pin on one of the OIDs leaves the whole chunk without values.
+    """
+    if errorStatus:
+        status = int(errorStatus)
+        if status == TOO_BIG and len(chunk) > 1:
+            half = len(chunk) // 2
+            pending.append(chunk[:half])
+            pending.append(chunk[half:])
+        elif status == NO_SUCH_NAME and 0 < int(errorIndex) <= len(chunk):
+            chunk = list(chunk)
+            results[chunk.pop(int(errorIndex) - 1)] = None
+            if chunk:
+                pending.append(chunk)
+        else:
+            for oid in chunk:
+                results[oid] = None
+    else:
+        for oid, varBind in zip(chunk, varBinds):
+            results[oid] = decode_value(varBind[1])
+
+
+def walk_table(ip, port, columns=IF_TABLE_COLUMNS, community='public', version=1,
+               max_repetitions=MAX_REPETITIONS, pool=session_pool, registry=metrics, credentials=None):
+    """
+    Walk several table columns at once and reassemble them into rows.
+
+    `columns` maps a column name to its base OID. Returns a dict of
+    row index -> {column name: value}, or None if the agent did not answer.
+    SNMPv2c and v3 agents are walked with GETBULK, SNMPv1 agents with GETNEXT.
+    """
+    columns = [(column, ObjectName(oid)) for column, oid in columns.items()]
+    session = pool.session(ip, port, community, version, credentials)
+    varBinds = [pool.object_type(str(base)) for _, base in columns]
+    if version == 0:
+        iterator = nextCmd(pool.engine(), session.auth, session.transport, session.context,
+                           *varBinds, lexicographicMode=False, lookupMib=False)
+    else:
+        iterator = bulkCmd(pool.engine(), session.auth, session.transport, session.context,
+                           0, max_repetitions, *varBinds, lexicographicMode=False, lookupMib=False)
+    records = {}
+    # The iterator hides the individual PDUs, so the whole walk counts as one request
+    started = time.monotonic()
+    try:
+        for errorIndication, errorStatus, errorIndex, varBindRow in iterator:
+            if errorIndication or errorStatus:
+                registry.observe_request((ip, port), "walkTable", time.monotonic() - started,
+                                         errorIndication, errorStatus)
+            if errorIndication:
+                return None
+            elif errorStatus:
+                return records
+            merge_table_rows(columns, [varBindRow], records)
+    except Exception as e:
+        registry.count_error("exception", type(e).__name__)
+        return None
+    registry.observe_request((ip, port), "walkTable", time.monotonic() - started)
+    return records
+
+
+def get_supported_interfaces(ip, port=161, **settings):
+    """
+    Query supported interfaces from the device. `settings` are the community,
+    version and credentials as returned by inventory.snmp_settings().
+    """
+    table = walk_table(ip, port, {"ifIndex": IF_TABLE_COLUMNS["ifIndex"]}, **settings)
+    if table is None:
+        print(f"SNMP Error: no response from {ip}:{port}")
+        return []
+    return [index for index in sorted(table) if index != 1]
+
+
+def merge_table_rows(columns, varBindTable, records):
+    """
+    Merge the rows of one GETNEXT/GETBULK response into `records`.
+
+    `columns` lists the (name, base OID) pairs in request order. Returns a dict
+    of column name -> last OID seen for each column still inside its subtree.
+    """
+    last = {}
+    done = set()
+    for varBindRow in varBindTable:
+        for (column, base), (name, value) in zip(columns, varBindRow):
+            if column in done:
+                continue
+            if isinstance(value, EndOfMibView) or not base.isPrefixOf(name):
+                done.add(column)
+                last.pop(column, None)
+                continue
+            index = tuple(name)[len(base):]
+            index = index[0] if len(index) == 1 else index
+            records.setdefault(index, {})[column] = decode_value(value)
+            last[column] = name
+    return last
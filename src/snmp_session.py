@@ -0,0 +1,255 @@
+import threading
+import time
+from pysnmp.hlapi import SnmpEngine, CommunityData, UdpTransportTarget, ContextData, ObjectType, ObjectIdentity
+from pysnmp.hlapi import (UsmUserData, usmKeyTypeMaster, usmNoAuthProtocol, usmHMACMD5AuthProtocol,
+                          usmHMACSHAAuthProtocol, usmHMAC128SHA224AuthProtocol, usmHMAC192SHA256AuthProtocol,
+                          usmHMAC256SHA384AuthProtocol, usmHMAC384SHA512AuthProtocol, usmNoPrivProtocol,
+                          usmDESPrivProtocol, usm3DESEDEPrivProtocol, usmAesCfb128Protocol, usmAesCfb192Protocol,
+                          usmAesCfb256Protocol)
+from pysnmp.hlapi.varbinds import AbstractVarBinds
+from pysnmp.hlapi.lcd import CommandGeneratorLcdConfigurator
+from pysnmp.entity import config
+from pysnmp.entity.config import authServices, privServices
+
+
+# version 3 selects SNMPv3 with USM credentials instead of a community
+SNMP_V3 = 3
+
+AUTH_PROTOCOLS = {
+    "none": usmNoAuthProtocol,
+    "md5": usmHMACMD5AuthProtocol,
+    "sha": usmHMACSHAAuthProtocol,
+    "sha224": usmHMAC128SHA224AuthProtocol,
+    "sha256": usmHMAC192SHA256AuthProtocol,
+    "sha384": usmHMAC256SHA384AuthProtocol,
+    "sha512": usmHMAC384SHA512AuthProtocol,
+}
+PRIV_PROTOCOLS = {
+    "none": usmNoPrivProtocol,
+    "des": usmDESPrivProtocol,
+    "3des": usm3DESEDEPrivProtocol,
+    "aes": usmAesCfb128Protocol,
+    "aes192": usmAesCfb192Protocol,
+    "aes256": usmAesCfb256Protocol,
+}
+
+# (protocol, passphrase) -> master key, shared by every engine of the process
+_master_keys = {}
+_master_keys_lock = threading.Lock()
+
+
+
+def parse_key(text, protocols, default):
+    """
+    Split "sha:passphrase" (or just "passphrase") into (protocol OID, passphrase).
+    """
+    name, separator, passphrase = text.partition(':')
+    if not separator or name.lower() not in protocols:
+        return protocols[default], text
+    return protocols[name.lower()], passphrase
+
+
+def master_key(protocol, passphrase, auth_protocol=None):
+    """
+    The RFC 3414 password-to-key hash of `passphrase`, computed once per process.
+
+    Hashing stretches the passphrase over a megabyte of input, far more work
+    than the request itself, so engines are handed the master keys and only
+    localize them (one short hash) for each agent's engine ID.
+    """
+    key = (protocol, passphrase, auth_protocol)
+    hashed = _master_keys.get(key)
+    if hashed is None:
+        if auth_protocol is None:
+            hashed = authServices[protocol].hashPassphrase(passphrase)
+        else:
+            hashed = privServices[protocol].hashPassphrase(auth_protocol, passphrase)
+        with _master_keys_lock:
+            hashed = _master_keys.setdefault(key, hashed)
+    return hashed
+
+
+def usm_user(credentials):
+    """
+    UsmUserData for (user, auth, priv) where auth and priv are "protocol:passphrase"
+    or None; authPriv with SHA and AES-128 unless the protocols are named.
+    USM has no privacy without authentication, so priv without auth raises ValueError.
+    """
+    user, auth, priv = credentials
+    if auth is None:
+        if priv is not None:
+            raise ValueError(f"SNMPv3 user '{user}' has a priv key but no auth key")
+        return UsmUserData(user)
+    auth_protocol, auth_key = parse_key(auth, AUTH_PROTOCOLS, "sha")
+    options = {"authKey": master_key(auth_protocol, auth_key), "authProtocol": auth_protocol,
+               "authKeyType": usmKeyTypeMaster}
+    if priv is not None:
+        priv_protocol, priv_key = parse_key(priv, PRIV_PROTOCOLS, "aes")
+        options.update(privKey=master_key(priv_protocol, priv_key, auth_protocol), privProtocol=priv_protocol,
+                       privKeyType=usmKeyTypeMaster)
+    return UsmUserData(user, **options)
+
+
+class SnmpSession:
+    """
+    Credentials, transport and context for one (ip, port, community, version) agent.
+    SNMPv3 sessions authenticate with `credentials`, a (user, auth, priv) tuple.
+    """
+    def __init__(self, ip, port, community, version, transport_factory, credentials=None, **transport_options):
+        self.key = (ip, port, community, version, credentials)
+        self.version = version
+        if version == SNMP_V3:
+            self.auth = usm_user(credentials)
+        else:
+            self.auth = CommunityData(community, mpModel=version)
+        self.transport = transport_factory((ip, port), **transport_options)
+        self.context = ContextData()
+        self.last_used = time.monotonic()
+
+
+class SessionPool:
+    """
+    Reuses SNMP engines, sessions and resolved OIDs across queries.
+
+    Booting an SnmpEngine loads the MIBs, so each thread gets one engine that is
+    shared by all of its sessions (an engine must not be used from two threads
+    at once). Sessions not used for `idle_timeout` seconds are evicted. The
+    engine outlives them: it keeps each SNMPv3 agent's discovered engine ID,
+    clock and localized keys, so only the first request to an agent pays for
+    discovery. With `per_thread` False the pool has a single engine, for
+    callers such as AsyncPoller that bind it to an event loop instead.
+
+    pysnmp adds a target entry to the engine for every (agent, timeout,
+    retries) it sends to and never removes it. After an eviction, or an
+    explicit prune(), each engine deletes the entries no live session uses
+    the next time its thread takes it from the pool.
+    """
+    def __init__(self, idle_timeout=300, transport_factory=UdpTransportTarget, per_thread=True):
+        self.idle_timeout = idle_timeout
+        self.transport_factory = transport_factory
+        self.per_thread = per_thread
+        self._engine = None
+        self._engines = []  # Every engine handed out, so close() reaches other threads' too
+        self._sessions = {}
+        self._object_types = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._last_eviction = time.monotonic()
+        self._generation = 0  # Bumped whenever the engines' target entries should be pruned
+
+    def engine(self):
+        if not self.per_thread:
+            if self._engine is None:
+                self._engine = SnmpEngine()
+                self._engines.append(self._engine)
+            return self._engine
+        engine = getattr(self._local, 'engine', None)
+        if engine is None:
+            engine = self._local.engine = SnmpEngine()
+            self._local.generation = self._generation
+            with self._lock:
+                self._engines.append(engine)
+        elif self._local.generation != self._generation:
+            # A synchronous caller has no request in flight when it takes the engine
+            self._local.generation = self._generation
+            self._prune(engine)
+        return engine
+
+    def session(self, ip, port=161, community='public', version=1, credentials=None, **transport_options):
+        """
+        Return the session for an agent, creating it on first use. Transport
+        options such as timeout and retries only apply when it is created.
+        """
+        if version != SNMP_V3:
+            credentials = None
+        key = (ip, port, community, version, credentials)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_eviction > self.idle_timeout / 4:
+                self._evict(now)
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = SnmpSession(ip, port, community, version, self.transport_factory,
+                                                            credentials, **transport_options)
+            session.last_used = now
+        return session
+
+    def object_type(self, oid):
+        """
+        Return a MIB-resolved ObjectType for `oid`, resolving it only once.
+        """
+        object_type = self._object_types.get(oid)
+        if object_type is None:
+            object_type = self.resolve(oid)
+            with self._lock:
+                object_type = self._object_types.setdefault(oid, object_type)
+        return object_type
+
+    def resolve(self, oid):
+        """
+        Return a MIB-resolved ObjectType for an OID used only once, such as the
+        next row of a walk, without keeping it. An engine builds a MIB compiler
+        the first time it resolves an OID itself, so requests handed to other
+        threads' engines should only carry resolved ObjectTypes.
+        """
+        mib_view = AbstractVarBinds.getMibViewController(self.engine())
+        return ObjectType(ObjectIdentity(oid)).resolveWithMib(mib_view)
+
+    def evict_idle(self):
+        with self._lock:
+            return self._evict(time.monotonic())
+
+    def _evict(self, now):
+        idle = [key for key, session in self._sessions.items() if now - session.last_used > self.idle_timeout]
+        for key in idle:
+            del self._sessions[key]
+        if idle:
+            self._generation += 1
+        self._last_eviction = now
+        return len(idle)
+
+    def prune(self):
+        """
+        Delete target entries that no session uses any more, such as those of
+        evicted agents or of timeouts a TimeoutPolicy has since changed. The
+        shared engine is pruned at once, so only call this while it has no
+        requests in flight; per-thread engines are pruned when next taken.
+        """
+        with self._lock:
+            self._generation += 1
+        if not self.per_thread and self._engine is not None:
+            return self._prune(self._engine)
+        return 0
+
+    def _prune(self, engine):
+        with self._lock:
+            live = {(session.transport.transportDomain, session.transport.transportAddr,
+                     session.transport.timeout, session.transport.retries) for session in self._sessions.values()}
+        # Keyed by (params, domain, address, timeout, retries, tags, interface)
+        addresses = CommandGeneratorLcdConfigurator()._getCache(engine)['addr']
+        stale = [key for key in addresses if key[1:5] not in live]
+        for key in stale:
+            name, _ = addresses.pop(key)
+            config.delTargetAddr(engine, name)
+        return len(stale)
+
+    def close(self):
+        """
+        Drop all sessions and shut down the transports of every engine. No
+        thread may still be sending through the pool.
+        """
+        with self._lock:
+            self._sessions.clear()
+            engines, self._engines = self._engines, []
+        for engine in engines:
+            if engine.transportDispatcher is not None:
+                engine.transportDispatcher.closeDispatcher()
+        self._local = threading.local()
+        self._engine = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+# Default pool of the snmp_client functions, shared by the traffic window's poll threads
+session_pool = SessionPool()
@@ -0,0 +1,96 @@
+import re
+from pyasn1.type import univ
+from pysnmp.proto import rfc1155
+from pysnmp.proto.rfc1902 import (Integer, Integer32, Unsigned32, Gauge32, Counter32, Counter64, TimeTicks,
+                                  OctetString, IpAddress, Opaque, ObjectIdentifier, ObjectName)
+from pysnmp.proto.rfc1905 import NoSuchObject, NoSuchInstance, EndOfMibView
+
+
+# Control characters other than tab, CR and LF mark an OctetString as binary
+_BINARY = re.compile(rb'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+
+
+
+def decode_octets(octets):
+    """
+    Text OctetStrings (sysDescr, sysName, ...) as str, binary ones (MACs,
+    Opaque) as bytes.
+    """
+    if _BINARY.search(octets) is None:
+        try:
+            return octets.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+    return octets
+
+
+def _octets(value):
+    return decode_octets(value.asOctets())
+
+
+def _ip_address(value):
+    return '.'.join(map(str, value.asOctets()))
+
+
+def _no_value(value):
+    return None
+
+
+# Python value of each SMI type, looked up by exact class. The rfc1155 types
+# are what SNMPv1 trap PDUs decode to; get and walk responses are rfc1902.
+DECODERS = {
+    univ.Integer: int,
+    Integer: int,
+    Integer32: int,
+    Unsigned32: int,
+    Gauge32: int,
+    Counter32: int,
+    Counter64: int,
+    TimeTicks: int,  # Hundredths of a second
+    rfc1155.Counter: int,
+    rfc1155.Gauge: int,
+    rfc1155.TimeTicks: int,
+    univ.OctetString: _octets,
+    OctetString: _octets,
+    Opaque: univ.OctetString.asOctets,
+    rfc1155.Opaque: univ.OctetString.asOctets,
+    IpAddress: _ip_address,
+    rfc1155.IpAddress: _ip_address,
+    univ.ObjectIdentifier: str,
+    ObjectIdentifier: str,
+    ObjectName: str,
+    NoSuchObject: _no_value,
+    NoSuchInstance: _no_value,
+    EndOfMibView: _no_value,
+}
+
+
+def decode_value(value):
+    """
+    Map an SNMP value straight to int, str, bytes or None (no value at the
+    agent); types without a decoder fall back to prettyPrint().
+    """
+    decoder = DECODERS.get(type(value))
+    if decoder is not None:
+        return decoder(value)
+    if isinstance(value, (NoSuchObject, NoSuchInstance, EndOfMibView)):
+        return None
+    return value.prettyPrint()
+
+
+def format_mac(value):
+    if not value:
+        return None
+    # A MAC whose bytes happen to be printable was decoded as text
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return ':'.join(f"{byte:02X}" for byte in value)
+
+
+def to_text(value):
+    """
+    Decoded values for display and text output; bytes as 0x-prefixed hex.
+    """
+    if isinstance(value, bytes):
+        return '0x' + value.hex()
+    return value
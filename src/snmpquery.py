@@ -0,0 +1,282 @@
+"""
+Headless SNMP discovery, polling and walking.
+
+    python snmpquery.py discover [TARGET ...] [--processes N]
+    python snmpquery.py poll [TARGET ...] --interval 10 [--oid OID ...]
+    python snmpquery.py walk [TARGET ...] --oid 1.3.6.1.2.1.2.2
+    python snmpquery.py walk [TARGET ...] --snapshot mib2.ndjson.gz
+    python snmpquery.py traps [--port 16162]
+
+TARGETs are inventory specs ("10.0.0.0/24:161 community=public version=0",
+"10.1.0.0/24 version=3 user=monitor auth=sha:secret1 priv=aes:secret2");
+without any, targets.txt or the local test agents are used. Output is JSON
+lines or CSV on stdout (or --output). No GUI modules are imported, and the
+SNMP stack is only loaded once a command runs.
+"""
+import argparse
+import csv
+import json
+import signal
+import sys
+import threading
+import time
+from inventory import Inventory, load_inventory
+
+
+DEFAULT_TARGETS = "127.0.0.1:16101-16160"
+
+
+
+class RecordWriter:
+    """
+    Write dict records as JSON lines or CSV rows with a fixed header. bytes
+    values (binary OctetStrings) are written as 0x-prefixed hex.
+    """
+    def __init__(self, stream, output_format, fields, header=True):
+        from snmp_values import to_text
+
+        self.to_text = to_text
+        self.stream = stream
+        self.output_format = output_format
+        self.fields = fields
+        self.csv = None
+        if output_format == "csv":
+            self.csv = csv.DictWriter(stream, fields, extrasaction='ignore')
+            if header:
+                self.csv.writeheader()
+
+    def write(self, record):
+        if self.csv is None:
+            self.stream.write(json.dumps(record, default=self.to_text) + "\n")
+            return
+        row = {}
+        for key, value in record.items():
+            if isinstance(value, dict):
+                value = ";".join(f"{k}={self.to_text(v)}" for k, v in value.items())
+            elif isinstance(value, list):
+                value = ";".join(str(self.to_text(v)) for v in value)
+            row[key] = self.to_text(value)
+        self.csv.writerow(row)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def load_targets(args):
+    if args.file:
+        return Inventory.from_file(args.file) + Inventory.from_specs(args.targets)
+    if args.targets:
+        return Inventory.from_specs(args.targets)
+    return load_inventory(DEFAULT_TARGETS)
+
+
+def poller_options(args):
+    options = {"limit": args.limit, "timeout": args.timeout, "retries": args.retries,
+               "deadline": args.deadline, "community": args.community, "version": args.version,
+               "user": args.user, "auth": args.auth, "priv": args.priv}
+    return {key: value for key, value in options.items() if value is not None}
+
+
+def make_policy(args):
+    from timeout_policy import TimeoutPolicy
+    # --timeout only seeds the adaptive timeouts
+    return TimeoutPolicy() if args.timeout is None else TimeoutPolicy(initial_timeout=args.timeout)
+
+
+def run_sweep(args, targets, job):
+    from async_poller import sweep
+
+    if args.processes:
+        from sharded_sweep import sharded_sweep
+        return sharded_sweep(targets, job, args.processes, policy=make_policy(args), **poller_options(args))
+    return sweep(targets, job, policy=make_policy(args), **poller_options(args))
+
+
+def discover(args, writer_factory):
+    from discovery import SYSTEM_OIDS, discover_device
+    from snmp_values import format_mac
+
+    writer = writer_factory(["ip", "port", "interfaces", "macs"] + list(SYSTEM_OIDS))
+    found = 0
+    for ip, port, result in run_sweep(args, load_targets(args), discover_device):
+        if result is None:
+            continue
+        interfaces, macs, values = result
+        record = {"ip": ip, "port": port, "interfaces": interfaces,
+                  "macs": {index: format_mac(mac) for index, mac in macs.items() if mac}}
+        for key, oid in SYSTEM_OIDS.items():
+            record[key] = values.get(oid)
+        writer.write(record)
+        found += 1
+    writer.flush()
+    print(f"{found} devices discovered", file=sys.stderr)
+
+
+def poll(args, writer_factory):
+    from functools import partial
+    from discovery import SYSTEM_OIDS, HOST_OIDS, get_scalars
+    from result_cache import ResultCache
+
+    oids = args.oid or list(HOST_OIDS.values())
+    names = {oid: name for name, oid in SYSTEM_OIDS.items()}
+    columns = [names.get(oid, oid) for oid in oids]
+    writer = writer_factory(["time", "ip", "port", "ok"] + columns)
+    job = partial(get_scalars, oids=tuple(oids))
+    cache = None if args.no_cache else ResultCache()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    # One poller (or process pool) for the whole run, so sessions, timeouts and SNMPv3 engine IDs carry over
+    if args.processes:
+        from sharded_sweep import ShardedSweeper
+        sweeper = ShardedSweeper(args.processes, policy=make_policy(args), cache=cache, **poller_options(args))
+    else:
+        from async_poller import Sweeper
+        sweeper = Sweeper(policy=make_policy(args), cache=cache, **poller_options(args))
+
+    sweeps = 0
+    try:
+        while not stop.is_set():
+            started = time.time()
+            for ip, port, values in sweeper.sweep(load_targets(args), job):
+                record = {"time": round(started, 3), "ip": ip, "port": port, "ok": values is not None}
+                for oid, column in zip(oids, columns):
+                    record[column] = (values or {}).get(oid)
+                writer.write(record)
+            writer.flush()
+            sweeps += 1
+            if args.count and sweeps >= args.count:
+                break
+            stop.wait(max(0.0, args.interval - (time.time() - started)))
+    finally:
+        sweeper.close()
+
+
+def walk(args, writer_factory):
+    from functools import partial
+    from async_poller import sweep
+    from discovery import MIB2_OID, walk_subtrees
+
+    snapshot = writer = None
+    if args.snapshot:
+        from snapshot import SnapshotWriter
+        snapshot = SnapshotWriter(args.snapshot)
+        sink = snapshot.write
+    else:
+        writer = writer_factory(["ip", "port", "oid", "value"])
+
+        def sink(ip, port, root, rows):
+            for oid, value in rows:
+                writer.write({"ip": ip, "port": port, "oid": oid, "value": value})
+
+    if args.processes:
+        # Responses go straight to the output, which only this process can write
+        print("walk runs in a single process, --processes is ignored", file=sys.stderr)
+    job = partial(walk_subtrees, roots=args.oid or [MIB2_OID], sink=sink, window=args.window)
+    walked = 0
+    try:
+        for ip, port, count in sweep(load_targets(args), job, policy=make_policy(args), **poller_options(args)):
+            if count is None:
+                print(f"No response from {ip}:{port}, its walk is incomplete", file=sys.stderr)
+            else:
+                walked += count
+    finally:
+        if snapshot is not None:
+            snapshot.close()
+        else:
+            writer.flush()
+    print(f"{walked} varbinds walked", file=sys.stderr)
+
+
+def traps(args, writer_factory):
+    import queue
+    from trap_receiver import TrapReceiver, TRAP_PORT, describe
+
+    writer = writer_factory(["time", "ip", "port", "agent", "trap", "event", "uptime", "varbinds"])
+    events = queue.Queue()
+    signal.signal(signal.SIGTERM, lambda *_: events.put(None))
+    receiver = TrapReceiver(events.put, args.host, args.port or TRAP_PORT, args.community or ('public',)).start()
+    try:
+        for event in iter(events.get, None):
+            writer.write({"time": round(event.received, 3), "ip": event.ip, "port": event.port, "agent": event.agent,
+                          "trap": event.trap_oid, "event": describe(event), "uptime": event.uptime,
+                          "varbinds": event.varbinds})
+            writer.flush()
+    finally:
+        receiver.stop()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="snmpquery", description="Headless SNMP discovery and polling.")
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("--format", choices=("json", "csv"), default="json")
+    output.add_argument("-o", "--output", help="write records to this file instead of stdout")
+    output.add_argument("--metrics-port", type=int, help="serve /metrics (Prometheus) and /stats (JSON) on this port")
+    output.add_argument("--stats", action="store_true", help="print request and error statistics when done")
+
+    common = argparse.ArgumentParser(add_help=False, parents=[output])
+    common.add_argument("targets", nargs="*", help="inventory specs, e.g. 10.0.0.0/24:161 community=public")
+    common.add_argument("-f", "--file", help="read target specs from this file")
+    common.add_argument("--community", help="default community (public)")
+    common.add_argument("--version", type=int, choices=(0, 1, 3), help="default SNMP version, 0 = v1, 1 = v2c, 3 = v3")
+    common.add_argument("--user", help="default SNMPv3 user")
+    common.add_argument("--auth", help="default SNMPv3 auth key as protocol:passphrase (md5, sha, sha224 ... sha512)")
+    common.add_argument("--priv", help="default SNMPv3 privacy key as protocol:passphrase (des, 3des, aes ... aes256)")
+    common.add_argument("--timeout", type=float, help="initial timeout in seconds")
+    common.add_argument("--retries", type=int)
+    common.add_argument("--deadline", type=float, help="upper bound in seconds for all requests to one target")
+    common.add_argument("--limit", type=int, help="concurrent targets per process")
+    common.add_argument("--processes", type=int, help="shard the targets across this many worker processes")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+    command = commands.add_parser("discover", parents=[common], help="interfaces, MACs and system group")
+    command.set_defaults(run=discover)
+
+    command = commands.add_parser("poll", parents=[common], help="poll scalars repeatedly")
+    command.add_argument("--oid", action="append", help="OID to poll, repeatable (default: host scalars)")
+    command.add_argument("--interval", type=float, default=10, help="seconds between sweep starts")
+    command.add_argument("--count", type=int, default=0, help="stop after this many sweeps (0 = run forever)")
+    command.add_argument("--no-cache", action="store_true", help="fetch slow-changing OIDs on every sweep")
+    command.set_defaults(run=poll)
+
+    command = commands.add_parser("walk", parents=[common], help="walk subtrees on every target")
+    command.add_argument("--oid", action="append", help="root of a subtree, repeatable (default: all of mib-2)")
+    command.add_argument("--snapshot", help="write a gzip-compressed NDJSON snapshot to this file (see snapshot.py)")
+    command.add_argument("--window", type=int, default=4, help="GETBULK requests in flight per target")
+    command.set_defaults(run=walk)
+
+    command = commands.add_parser("traps", parents=[output], help="record incoming traps and informs")
+    command.add_argument("--host", default='0.0.0.0')
+    command.add_argument("--port", type=int, help="UDP port to listen on (default 16162)")
+    command.add_argument("--community", action="append", help="accepted community, repeatable (default: public)")
+    command.set_defaults(run=traps)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "priv", None) and not args.auth:
+        parser.error("--priv needs --auth, SNMPv3 has no privacy without authentication")
+    # Output files are appended to, so a restarted daemon continues its log
+    stream = open(args.output, "a", newline="", encoding="utf-8") if args.output else sys.stdout
+    header = stream is sys.stdout or stream.tell() == 0
+    if args.metrics_port:
+        from metrics import serve_metrics
+        serve_metrics(args.metrics_port)
+    try:
+        args.run(args, lambda fields: RecordWriter(stream, args.format, fields, header))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+        if args.stats:
+            from metrics import metrics
+            print(json.dumps(metrics.snapshot(), indent=2), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,73 +1,181 @@
 import time
 import sqlite3
-from pysnmp.hlapi import *
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QWidget, QTableWidget, QTableWidgetItem,QPushButton, QMessageBox, QHBoxLayout, QLineEdit)
-from PyQt5.QtCore import QTimer, QThread, pyqtSignal
-
-
-
-def snmp_get(ip, oid, port=161):
-    try:
-        iterator = getCmd(SnmpEngine(),
-                          CommunityData('public', mpModel=0),
-                          UdpTransportTarget((ip, port)),
-                          ContextData(),
-                          ObjectType(ObjectIdentity(oid)))
-        errorIndication, errorStatus, errorIndex, varBinds = next(iterator)
-        if errorIndication or errorStatus:
-            return None
-        else:
-            for varBind in varBinds:
-                return varBind[1]
-    except Exception as e:
-        return None
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QWidget, QTableView,QPushButton, QMessageBox, QHBoxLayout, QLineEdit)
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, QObject, Qt, QTimer, QThread, pyqtSignal
+from inventory import load_inventory
+from timeout_policy import TimeoutPolicy
+from result_cache import ResultCache
+
+# The SNMP stack is imported by the sweep thread on its first run, so the
+# window is up before pysnmp has loaded
+
+
 
+def connect(db_name):
+    """
+    Open a connection in WAL mode so sweeps can write while the GUI reads.
+    """
+    conn = sqlite3.connect(db_name, check_same_thread=False, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints, no fsync per commit
+    conn.execute("PRAGMA cache_size=-16000")  # 16 MB page cache
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
 
 
 class DatabaseManager:
     def __init__(self, db_name="hosts.db"):
         self.db_name = db_name  # 保存数据库文件名
-        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        self.conn = connect(db_name)
         self.create_table()
 
-    def create_table(self):
-        query = """
-        CREATE TABLE IF NOT EXISTS hosts (
+    # sysUpTime is kept as integer ticks (hundredths of a second)
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS {table} (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             ip TEXT NOT NULL,
             port INTEGER NOT NULL,
             sysDescr TEXT,
             sysName TEXT,
-            sysUpTime TEXT,
+            sysUpTime INTEGER,
             sysLocation TEXT,
             customData TEXT DEFAULT '',
             lastUpdated TEXT,
+            lastSeen TEXT,
+            lastEvent TEXT,
             UNIQUE(ip, port) ON CONFLICT REPLACE
         )
         """
-        self.conn.execute(query)
+
+    def create_table(self):
+        self.conn.execute(self.SCHEMA.format(table="hosts"))
+        types = {row[1]: row[2] for row in self.conn.execute("PRAGMA table_info(hosts)")}
+        for column in ("lastSeen", "lastEvent"):
+            if column not in types:
+                self.conn.execute(f"ALTER TABLE hosts ADD COLUMN {column} TEXT")
+        if types["sysUpTime"] != "INTEGER":
+            self.migrate_uptime()
+        self.conn.execute("CREATE INDEX IF NOT EXISTS hosts_lastUpdated ON hosts (lastUpdated)")
         self.conn.commit()
 
+    def migrate_uptime(self):
+        """
+        Rebuild a hosts table from before sysUpTime was numeric: a TEXT column
+        would turn the ticks back into strings. "N/A" becomes NULL.
+        """
+        columns = ("id, ip, port, sysDescr, sysName, sysUpTime, sysLocation, customData, "
+                   "lastUpdated, lastSeen, lastEvent")
+        with self.conn:
+            self.conn.execute("DROP INDEX IF EXISTS hosts_lastUpdated")
+            self.conn.execute(self.SCHEMA.format(table="hosts_migrated"))
+            self.conn.execute(f"""
+            INSERT INTO hosts_migrated ({columns})
+            SELECT {columns.replace("sysUpTime",
+                                    "CASE WHEN sysUpTime GLOB '[0-9]*' THEN CAST(sysUpTime AS INTEGER) END")}
+            FROM hosts
+            """)
+            self.conn.execute("DROP TABLE hosts")
+            self.conn.execute("ALTER TABLE hosts_migrated RENAME TO hosts")
+
     def add_or_update_host(self, ip, port, sysDescr, sysName, sysUpTime, sysLocation):
+        self.upsert_hosts([(ip, port, sysDescr, sysName, sysUpTime, sysLocation)])
+
+    def upsert_hosts(self, records):
+        """
+        Insert or update many (ip, port, sysDescr, sysName, sysUpTime, sysLocation)
+        records in a single transaction. Returns the ids of the written hosts.
+        """
         timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
         query = """
-        INSERT INTO hosts (ip, port, sysDescr, sysName, sysUpTime, sysLocation, lastUpdated)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+        INSERT INTO hosts (ip, port, sysDescr, sysName, sysUpTime, sysLocation, lastUpdated, lastSeen)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ON CONFLICT(ip, port) DO UPDATE SET
             sysDescr=excluded.sysDescr,
             sysName=excluded.sysName,
             sysUpTime=excluded.sysUpTime,
             sysLocation=excluded.sysLocation,
-            lastUpdated=excluded.lastUpdated
+            lastUpdated=excluded.lastUpdated,
+            lastSeen=excluded.lastSeen
         """
-        self.conn.execute(query, (ip, port, sysDescr or "N/A", sysName or "N/A", sysUpTime or "N/A",
-                                  sysLocation or "N/A", timestamp))
-        self.conn.commit()
+        rows = [(ip, port, str(sysDescr or "N/A"), str(sysName or "N/A"), sysUpTime, str(sysLocation or "N/A"),
+                 timestamp, timestamp)
+                for ip, port, sysDescr, sysName, sysUpTime, sysLocation in records]
+        with self.conn:
+            self.conn.executemany(query, rows)
+        return [self.conn.execute("SELECT id FROM hosts WHERE ip=? AND port=?", (ip, port)).fetchone()[0]
+                for ip, port, *_ in records]
+
+    def touch_hosts(self, heartbeats):
+        """
+        Record that (ip, port, sysUpTime) hosts answered without changing
+        anything else. lastUpdated is left alone. Returns the number of hosts
+        that still exist.
+        """
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        rows = [(sysUpTime, timestamp, ip, port) for ip, port, sysUpTime in heartbeats]
+        with self.conn:
+            cursor = self.conn.executemany("UPDATE hosts SET sysUpTime=?, lastSeen=? WHERE ip=? AND port=?", rows)
+        return cursor.rowcount
+
+    def get_host_contents(self):
+        """
+        Return {(ip, port): (id, (sysDescr, sysName, sysLocation))} for change detection.
+        """
+        cursor = self.conn.execute("SELECT id, ip, port, sysDescr, sysName, sysLocation FROM hosts")
+        return {(ip, port): (host_id, (sysDescr, sysName, sysLocation))
+                for host_id, ip, port, sysDescr, sysName, sysLocation in cursor}
 
     def get_all_hosts(self):
         cursor = self.conn.execute("SELECT * FROM hosts")
         return cursor.fetchall()
 
+    # Columns shown in the hosts table, plus lastUpdated for change detection
+    HOST_COLUMNS = "id, ip, port, sysDescr, sysName, sysUpTime, sysLocation, lastEvent, lastUpdated"
+
+    def count_hosts(self, max_id=None):
+        if max_id is None:
+            return self.conn.execute("SELECT COUNT(*) FROM hosts").fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM hosts WHERE id <= ?", (max_id,)).fetchone()[0]
+
+    def get_hosts_page(self, after_id, limit):
+        query = f"SELECT {self.HOST_COLUMNS} FROM hosts WHERE id > ? ORDER BY id LIMIT ?"
+        return self.conn.execute(query, (after_id, limit)).fetchall()
+
+    def get_hosts_updated_since(self, timestamp, max_id):
+        query = f"SELECT {self.HOST_COLUMNS} FROM hosts WHERE lastUpdated >= ? AND id <= ?"
+        return self.conn.execute(query, (timestamp, max_id)).fetchall()
+
+    def get_hosts_by_ids(self, host_ids, chunk_size=500):
+        host_ids = list(host_ids)
+        hosts = []
+        for start in range(0, len(host_ids), chunk_size):
+            chunk = host_ids[start:start + chunk_size]
+            query = f"SELECT {self.HOST_COLUMNS} FROM hosts WHERE id IN ({', '.join('?' * len(chunk))})"
+            hosts += self.conn.execute(query, chunk).fetchall()
+        return hosts
+
+    def find_trap_host(self, ip, port, agent):
+        """
+        (id, ip, port) of the host a trap from ip:port came from: the host polled
+        at exactly that address, else the only host polled at the agent address
+        or, failing that, at `ip`. Traps usually leave from an ephemeral port,
+        so None when several hosts share the address.
+        """
+        host = self.conn.execute("SELECT id, ip, port FROM hosts WHERE ip=? AND port=?", (ip, port)).fetchone()
+        if host is not None:
+            return host
+        for address in dict.fromkeys((agent, ip)):
+            hosts = self.conn.execute("SELECT id, ip, port FROM hosts WHERE ip=? LIMIT 2", (address,)).fetchall()
+            if hosts:
+                return hosts[0] if len(hosts) == 1 else None
+        return None
+
+    def record_event(self, host_ids, description):
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        rows = [(f"{timestamp} {description}", timestamp, host_id) for host_id in host_ids]
+        with self.conn:
+            self.conn.executemany("UPDATE hosts SET lastEvent=?, lastUpdated=? WHERE id=?", rows)
+
     def update_custom_data(self, host_id, custom_data):
         query = "UPDATE hosts SET customData=? WHERE id=?"
         self.conn.execute(query, (custom_data, host_id))
@@ -81,52 +189,250 @@ class DatabaseManager:
 
 # SNMP Query Thread
 class SNMPQueryThread(QThread):
-    update_signal = pyqtSignal()
+    update_signal = pyqtSignal(list)  # ids of hosts whose data changed or that answered (sysUpTime moved)
 
-    def __init__(self, db_name):
+    write_batch = 1000  # Changed hosts written per transaction while the sweep is running
+
+    def __init__(self, db_name, inventory=None, processes=None):
         super().__init__()
         self.db_name = db_name
+        self.inventory = inventory or load_inventory("127.0.0.1:16101-16159")
+        self.processes = processes  # Worker processes for very large inventories, None sweeps in this thread
+        self.targets = None  # Set by the scheduler to sweep only these (ip, port) targets next
+        # Started on the first sweep and kept for the next ones, so SNMPv3 engine IDs and keys carry over
+        self.sweeper = None
+        self.db_manager = None  # Opened on the first sweep and kept for the next ones
+        self.last_contents = None  # (ip, port) -> (id, content) as last written
+
+    def results(self, targets):
+        from discovery import query_host
+
+        if self.sweeper is None:
+            if self.processes:
+                from sharded_sweep import ShardedSweeper
+                # Each worker keeps its own TimeoutPolicy and ResultCache for the agents hashed to it
+                self.sweeper = ShardedSweeper(self.processes, version=0, policy=TimeoutPolicy(), cache=ResultCache())
+            else:
+                from async_poller import Sweeper
+                # The policy carries RTTs and dead agents over from sweep to sweep, the cache slow-changing scalars
+                self.sweeper = Sweeper(version=0, policy=TimeoutPolicy(), cache=ResultCache())
+        return self.sweeper.sweep(targets, query_host)
+
+    def close(self):
+        if self.sweeper is not None:
+            self.sweeper.close()
+            self.sweeper = None
 
     def run(self):
-        oids = {
-            "sysDescr": '1.3.6.1.2.1.1.1.0',
-            "sysName": '1.3.6.1.2.1.1.5.0',
-            "sysUpTime": '1.3.6.1.2.1.1.3.0',
-            "sysLocation": '1.3.6.1.2.1.1.6.0',
-        }
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        from discovery import HOST_OIDS
+        from snmp_values import to_text
+
+        if self.db_manager is None:
+            self.db_manager = DatabaseManager(self.db_name)
+        if self.last_contents is None:
+            self.last_contents = self.db_manager.get_host_contents()
+
+        changed, contents, heartbeats, host_ids, touched_ids = [], [], [], [], []
+
+        def write_changed():
+            ids = self.db_manager.upsert_hosts(changed)
+            for (ip, port, *_), host_id, content in zip(changed, ids, contents):
+                self.last_contents[(ip, port)] = (host_id, content)
+            host_ids.extend(ids)
+            changed.clear()
+            contents.clear()
+
+        targets = self.inventory if self.targets is None else self.targets
+        for ip, port, values in self.results(targets):
+            values = values or {}
+            sysDescr = to_text(values.get(HOST_OIDS["sysDescr"]))
+            sysName = to_text(values.get(HOST_OIDS["sysName"]))
+            sysUpTime = values.get(HOST_OIDS["sysUpTime"])
+            sysUpTime = sysUpTime if isinstance(sysUpTime, int) else None  # Integer ticks
+            sysLocation = to_text(values.get(HOST_OIDS["sysLocation"]))
+
+            if sysDescr or sysName:
+                # sysUpTime moves on every poll, so it only rides along with the heartbeat
+                content = (str(sysDescr or "N/A"), str(sysName or "N/A"), str(sysLocation or "N/A"))
+                previous = self.last_contents.get((ip, port))
+                if previous is not None and previous[1] == content:
+                    heartbeats.append((ip, port, sysUpTime))
+                    touched_ids.append(previous[0])
+                else:
+                    changed.append((ip, port, sysDescr, sysName, sysUpTime, sysLocation))
+                    contents.append(content)
+                    if len(changed) >= self.write_batch:
+                        write_changed()
+
+        write_changed()
+        if self.db_manager.touch_hosts(heartbeats) < len(heartbeats):
+            # Some cached hosts were deleted meanwhile; re-read the cache next sweep
+            self.last_contents = None
+        # Heartbeat rows are refreshed too, or their UpTime column would go stale
+        self.update_signal.emit(host_ids + touched_ids)
+
+
+# Refresh Scheduler
+class RefreshScheduler(QObject):
+    """
+    Runs at most one SNMP sweep at a time.
+
+    A refresh requested while a sweep is running is coalesced into a single
+    follow-up sweep (or dropped if `queue_pending` is False) and counted as
+    skipped. Requests for a few targets only (hosts that sent a trap) are
+    always queued, and merged into one targeted sweep unless a full one is
+    pending anyway. `sweep_finished` reports each sweep's duration in seconds
+    and the number of ticks skipped so far.
+    """
+    sweep_finished = pyqtSignal(float, int)
+
+    def __init__(self, thread, queue_pending=True):
+        super().__init__()
+        self.thread = thread
+        self.queue_pending = queue_pending
+        self.pending = False
+        self.pending_targets = set()
+        self.skipped = 0
+        self.last_duration = None
+        self._started = None
+        self.thread.finished.connect(self._on_finished)
+
+    def request(self, targets=None):
+        if self.thread.isRunning():
+            if targets is not None:
+                self.pending_targets.update(targets)
+            else:
+                self.skipped += 1
+                self.pending = self.queue_pending
+            return False
+        self._started = time.monotonic()
+        self.thread.targets = None if targets is None else list(targets)
+        self.thread.start()
+        return True
+
+    def _on_finished(self):
+        self.last_duration = time.monotonic() - self._started
+        self.sweep_finished.emit(self.last_duration, self.skipped)
+        if self.pending:
+            self.pending = False
+            self.pending_targets.clear()
+            self.request()
+        elif self.pending_targets:
+            targets, self.pending_targets = self.pending_targets, set()
+            self.request(targets)
+
+
+# Hosts Table Model
+class HostTableModel(QAbstractTableModel):
+    """
+    Hosts table backed by the database.
+
+    Rows are read in batches as the view scrolls (canFetchMore/fetchMore), and
+    refresh() re-reads only rows whose lastUpdated moved, emitting dataChanged
+    for just those rows.
+    """
+    headers = ["ID", "IP", "Port", "Description", "Name", "UpTime", "Location", "Last Event"]
+
+    def __init__(self, db_manager, batch_size=500):
+        super().__init__()
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.reload()
+
+    def reload(self):
+        self.beginResetModel()
+        self._rows = []
+        self._row_of_id = {}
+        self._last_seen = ""
+        self._total = self.db_manager.count_hosts()
+        self.endResetModel()
+        self.fetchMore()
+
+    def refresh(self):
+        if not self._rows:
+            self.reload()
+            return
+        max_id = self._rows[-1][0]
+        if self.db_manager.count_hosts(max_id) != len(self._rows):
+            # Hosts were deleted, so the loaded rows no longer line up
+            self.reload()
+            return
 
-        try:
-            for port in range(16101, 16160):
-                ip = "127.0.0.1"
-                sysDescr = snmp_get(ip, oids["sysDescr"], port)
-                sysName = snmp_get(ip, oids["sysName"], port)
-                sysUpTime = snmp_get(ip, oids["sysUpTime"], port)
-                sysLocation = snmp_get(ip, oids["sysLocation"], port)
-
-                if sysDescr or sysName:
-                    timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-                    cursor.execute("""
-                    INSERT INTO hosts (ip, port, sysDescr, sysName, sysUpTime, sysLocation, lastUpdated)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(ip, port) DO UPDATE SET
-                    sysDescr=excluded.sysDescr,
-                    sysName=excluded.sysName,
-                    sysUpTime=excluded.sysUpTime,
-                    sysLocation=excluded.sysLocation,
-                    lastUpdated=excluded.lastUpdated
-                    """, (ip, port, str(sysDescr or "N/A"), str(sysName or "N/A"), 
-                    str(sysUpTime or "N/A"), str(sysLocation or "N/A"), timestamp))
-            conn.commit()
-        finally:
-            conn.close()
-        self.update_signal.emit()
+        last_column = len(self.headers) - 1
+        for host in self.db_manager.get_hosts_updated_since(self._last_seen, max_id):
+            row = self._row_of_id[host[0]]
+            if host[-1] != self._rows[row][-1]:
+                self._rows[row] = host
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+            self._last_seen = max(self._last_seen, host[-1] or "")
+
+        fully_loaded = len(self._rows) == self._total
+        self._total = self.db_manager.count_hosts()
+        if fully_loaded and self.canFetchMore():
+            self.fetchMore()
+
+    def refresh_rows(self, host_ids):
+        """
+        Re-read just the given hosts, e.g. the ones a sweep reported as changed.
+        """
+        if not host_ids:
+            return
+        last_column = len(self.headers) - 1
+        for host in self.db_manager.get_hosts_by_ids(host_ids):
+            row = self._row_of_id.get(host[0])
+            if row is not None:
+                self._rows[row] = host
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+            self._last_seen = max(self._last_seen, host[-1] or "")
+
+        fully_loaded = len(self._rows) == self._total
+        self._total = self.db_manager.count_hosts()
+        if fully_loaded and self.canFetchMore():
+            self.fetchMore()
+
+    def host_id(self, row):
+        return self._rows[row][0]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            value = self._rows[index.row()][index.column()]
+            return "" if value is None else str(value)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and len(self._rows) < self._total
+
+    def fetchMore(self, parent=QModelIndex()):
+        after_id = self._rows[-1][0] if self._rows else 0
+        hosts = self.db_manager.get_hosts_page(after_id, self.batch_size)
+        if not hosts:
+            self._total = len(self._rows)
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(hosts) - 1)
+        for host in hosts:
+            self._row_of_id[host[0]] = len(self._rows)
+            self._rows.append(host)
+            self._last_seen = max(self._last_seen, host[-1] or "")
+        self.endInsertRows()
 
 
 # GUI Host Information Manager
 class HostInfoManager(QMainWindow):
-    def __init__(self, db_manager):
+    trap_signal = pyqtSignal(object)  # TrapEvents, emitted from the receiver's thread
+
+    def __init__(self, db_manager, refresh_interval=10, trap_port=None, trap_refresh_interval=60):
         super().__init__()
         self.db_manager = db_manager
         self.setWindowTitle("SNMP Host Information Manager")
@@ -138,9 +444,9 @@ class HostInfoManager(QMainWindow):
         layout = QVBoxLayout(self.central_widget)
 
         # Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels(["ID", "IP", "Port", "Description", "Name", "UpTime", "Location"])
+        self.model = HostTableModel(self.db_manager)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         layout.addWidget(self.table)
 
 
@@ -158,31 +464,69 @@ class HostInfoManager(QMainWindow):
 
         layout.addLayout(button_layout)
 
-        # SNMP Thread
+        # SNMP Thread, one sweep at a time
         self.snmp_thread = SNMPQueryThread(self.db_manager.db_name)
-        self.snmp_thread.update_signal.connect(self.load_host_data)
+        self.snmp_thread.update_signal.connect(self.model.refresh_rows)
+        self.scheduler = RefreshScheduler(self.snmp_thread)
+        self.scheduler.sweep_finished.connect(self.show_sweep_stats)
 
         # Auto Refresh Timer
         self.timer = QTimer()
-        self.timer.timeout.connect(self.snmp_thread.start)
-        self.timer.start(10000)
+        self.timer.timeout.connect(self.refresh_snmp_data)
+        self.timer.start(refresh_interval * 1000)
+
+        # Traps trigger an immediate sweep of the sending hosts, so the full sweep can run less often.
+        # trap_port None listens on trap_receiver.TRAP_PORT, 0 disables the receiver
+        self.trap_receiver = None
+        self.trap_signal.connect(self.handle_trap)
+        if trap_port != 0:
+            QTimer.singleShot(0, lambda: self.start_trap_receiver(trap_port, trap_refresh_interval))
 
         self.load_host_data()
 
+    def start_trap_receiver(self, port, refresh_interval):
+        from trap_receiver import TrapReceiver, TRAP_PORT
+        port = port or TRAP_PORT
+        try:
+            self.trap_receiver = TrapReceiver(self.trap_signal.emit, port=port).start()
+        except OSError as e:
+            self.statusBar().showMessage(f"Trap receiver not started on port {port}: {e}")
+            return
+        self.timer.setInterval(refresh_interval * 1000)
+        # Don't leave the table empty for a whole stretched interval: traps only report changes
+        self.scheduler.request()
+
+    def handle_trap(self, event):
+        from trap_receiver import describe
+        host = self.db_manager.find_trap_host(event.ip, event.port, event.agent)
+        description = describe(event)
+        self.statusBar().showMessage(f"{description} from {event.agent}")
+        if host is None:
+            return
+        host_id, ip, port = host
+        self.db_manager.record_event([host_id], description)
+        self.model.refresh_rows([host_id])
+        self.scheduler.request([(ip, port)])
+
+    def refresh_snmp_data(self):
+        self.scheduler.request()
+
+    def show_sweep_stats(self, duration, skipped):
+        self.statusBar().showMessage(f"Last sweep took {duration:.1f}s, {skipped} refresh ticks skipped")
+
     def load_host_data(self):
-        self.table.setRowCount(0)
-        for row, host in enumerate(self.db_manager.get_all_hosts()):
-            self.table.insertRow(row)
-            for col, value in enumerate(host):
-                self.table.setItem(row, col, QTableWidgetItem(str(value)))
+        self.model.refresh()
+
+    def selected_host_id(self):
+        index = self.table.currentIndex()
+        return self.model.host_id(index.row()) if index.isValid() else None
 
     def save_custom_data(self):
-        selected_row = self.table.currentRow()
-        if selected_row == -1:
+        host_id = self.selected_host_id()  # 获取 ID
+        if host_id is None:
             QMessageBox.warning(self, "Warning", "Please select a row to save custom data.")
             return
 
-        host_id = self.table.item(selected_row, 0).text()  # 获取 ID
         custom_data = self.custom_input.text()  # 获取输入的数据
         if not custom_data.strip():
             QMessageBox.warning(self, "Warning", "Custom data cannot be empty.")
@@ -194,15 +538,22 @@ class HostInfoManager(QMainWindow):
         self.load_host_data()
 
     def delete_selected_host(self):
-        selected_row = self.table.currentRow()
-        if selected_row == -1:
+        host_id = self.selected_host_id()
+        if host_id is None:
             QMessageBox.warning(self, "Warning", "Please select a row to delete.")
             return
 
-        host_id = self.table.item(selected_row, 0).text()
         self.db_manager.delete_host(int(host_id))
         QMessageBox.information(self, "Info", "Selected host deleted successfully.")
-        self.load_host_data()
+        self.model.reload()
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        if self.trap_receiver is not None:
+            self.trap_receiver.stop()
+        self.snmp_thread.wait()
+        self.snmp_thread.close()
+        super().closeEvent(event)
 
 
 
@@ -0,0 +1,104 @@
+import time
+
+
+# Timeouts are rounded up to this step so pysnmp does not configure a new
+# target entry for every slightly different value
+TIMEOUT_STEP = 0.05
+
+
+
+class AgentHealth:
+    def __init__(self):
+        self.srtt = None  # Smoothed round-trip time
+        self.rttvar = None  # Round-trip time variation
+        self.failures = 0  # Consecutive failed requests
+        self.probe_interval = 0
+        self.next_probe = 0
+
+
+class TimeoutPolicy:
+    """
+    Per-agent adaptive timeouts, backoff and quarantine.
+
+    Round-trip times are smoothed as an EWMA with variance (as TCP does), and
+    an agent's timeout is srtt + k * rttvar. Each consecutive failure doubles
+    the timeout; after `quarantine_after` failures the agent is only probed
+    every `probe_interval` seconds, doubling up to `max_probe_interval`, until
+    it answers again.
+    """
+    def __init__(self, initial_timeout=1.0, min_timeout=0.1, max_timeout=5.0, alpha=1 / 8, beta=1 / 4, k=4,
+                 quarantine_after=3, probe_interval=60, max_probe_interval=900):
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.alpha = alpha
+        self.beta = beta
+        self.k = k
+        self.quarantine_after = quarantine_after
+        self.initial_probe_interval = probe_interval
+        self.max_probe_interval = max_probe_interval
+        self.agents = {}
+
+    def _health(self, key):
+        health = self.agents.get(key)
+        if health is None:
+            health = self.agents[key] = AgentHealth()
+        return health
+
+    def timeout(self, key):
+        health = self.agents.get(key)
+        if health is None or health.srtt is None:
+            timeout = self.initial_timeout
+        else:
+            timeout = health.srtt + self.k * health.rttvar
+        if health is not None:
+            timeout *= 2 ** min(health.failures, 8)
+        timeout = min(max(timeout, self.min_timeout), self.max_timeout)
+        return round(-(-timeout // TIMEOUT_STEP) * TIMEOUT_STEP, 3)
+
+    def retries(self, key):
+        # An agent that is already failing gets no retransmissions
+        health = self.agents.get(key)
+        return 0 if health is not None and health.failures else 1
+
+    def is_quarantined(self, key):
+        health = self.agents.get(key)
+        return health is not None and health.failures >= self.quarantine_after
+
+    def should_poll(self, key, now=None):
+        """
+        False while a quarantined agent is waiting for its next probe.
+        """
+        if not self.is_quarantined(key):
+            return True
+        now = time.monotonic() if now is None else now
+        return now >= self.agents[key].next_probe
+
+    def record_success(self, key, rtt, timeout=None):
+        health = self._health(key)
+        health.failures = 0
+        health.probe_interval = 0
+        # Karn's rule: an answer that took longer than the timeout may belong
+        # to a retransmission, so it says nothing about the round-trip time
+        if timeout is not None and rtt >= timeout:
+            return
+        if health.srtt is None:
+            health.srtt = rtt
+            health.rttvar = rtt / 2
+        else:
+            health.rttvar = (1 - self.beta) * health.rttvar + self.beta * abs(health.srtt - rtt)
+            health.srtt = (1 - self.alpha) * health.srtt + self.alpha * rtt
+
+    def record_failure(self, key, now=None):
+        health = self._health(key)
+        health.failures += 1
+        if health.failures >= self.quarantine_after:
+            now = time.monotonic() if now is None else now
+            if health.probe_interval:
+                health.probe_interval = min(health.probe_interval * 2, self.max_probe_interval)
+            else:
+                health.probe_interval = self.initial_probe_interval
+            health.next_probe = now + health.probe_interval
+
+    def quarantined(self):
+        return [key for key in self.agents if self.is_quarantined(key)]
@@ -0,0 +1,227 @@
+import time
+import threading
+import numpy as np
+from PyQt5.QtWidgets import QMainWindow, QVBoxLayout, QWidget, QLabel
+from PyQt5.QtCore import QThread, pyqtSignal
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+from snmp_client import snmp_get_many, get_supported_interfaces
+from counter_store import CounterStore
+from rates import RateEngine
+from ring_buffer import RingBuffer
+
+
+
+# Columns of each interface's history buffer
+TIME, RECEIVED, SENT = range(3)
+
+
+class TrafficPollThread(QThread):
+    """
+    Polls one device's interface counters off the GUI thread and publishes
+    each poll as a batch of rates.
+    """
+    interfaces_signal = pyqtSignal(list)
+    sample_signal = pyqtSignal(float, object)  # poll time, {ifIndex: (received B/s, sent B/s)}
+
+    rx_oid_base = '1.3.6.1.2.1.2.2.1.10'  # Base OID for ifInOctets
+    tx_oid_base = '1.3.6.1.2.1.2.2.1.16'  # Base OID for ifOutOctets
+    hc_rx_oid_base = '1.3.6.1.2.1.31.1.1.1.6'  # Base OID for ifHCInOctets
+    hc_tx_oid_base = '1.3.6.1.2.1.31.1.1.1.10'  # Base OID for ifHCOutOctets
+    uptime_oid = '1.3.6.1.2.1.1.3.0'  # sysUpTime, to spot agent reboots
+
+    def __init__(self, target, port, interval=10, settings=None):
+        super().__init__()
+        self.target_ip = target
+        self.target_port = port
+        self.interval = interval
+        self.settings = settings or {}  # Community, version and SNMPv3 credentials
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def poll_now(self):
+        """
+        Cut the current wait short, e.g. when the device sent a link trap.
+        """
+        self._wake.set()
+
+    def run(self):
+        interfaces = get_supported_interfaces(self.target_ip, self.target_port, **self.settings)
+        self.interfaces_signal.emit(interfaces)
+        if not interfaces:
+            return
+
+        rates = RateEngine(2 * len(interfaces))  # rx, tx per interface
+        store = CounterStore()  # Full counter history, the plot only shows the latest samples
+        try:
+            while not self._stop.is_set():
+                now = time.time()
+                self.sample_signal.emit(now, self.poll(interfaces, now, rates, store))
+                self._wake.wait(self.interval)
+                self._wake.clear()
+        finally:
+            store.close()
+
+    def poll(self, interfaces, now, rates, store):
+        # SNMPv1 has no Counter64: each HC OID would come back noSuchName and cost a re-send
+        high_capacity = self.settings.get("version", 1) != 0
+        oids = [self.uptime_oid]
+        for index in interfaces:
+            if high_capacity:
+                oids += [f"{self.hc_rx_oid_base}.{index}", f"{self.hc_tx_oid_base}.{index}"]
+            oids += [f"{self.rx_oid_base}.{index}", f"{self.tx_oid_base}.{index}"]
+        values = snmp_get_many(self.target_ip, self.target_port, oids, **self.settings) or {}
+
+        # Prefer the 64-bit counters, fall back to Counter32 where the agent has no ifXTable.
+        # Counters and TimeTicks arrive as ints; anything else (noSuchInstance, a bogus type) is missing.
+        counters, widths, valid = [], [], []
+        for index in interfaces:
+            hc = [values.get(f"{self.hc_rx_oid_base}.{index}"), values.get(f"{self.hc_tx_oid_base}.{index}")]
+            low = [values.get(f"{self.rx_oid_base}.{index}"), values.get(f"{self.tx_oid_base}.{index}")]
+            if all(isinstance(value, int) for value in hc):
+                pair, width = hc, 64
+            elif all(isinstance(value, int) for value in low):
+                pair, width = low, 32
+            else:
+                pair, width = [0, 0], 0
+            counters += pair
+            widths += [width, width]
+            valid += [width > 0, width > 0]
+
+        uptime = values.get(self.uptime_oid)
+        interface_rates = rates.update(counters, now, widths, valid, uptime if isinstance(uptime, int) else None)
+
+        samples = {}
+        for position, index in enumerate(interfaces):
+            if valid[2 * position]:
+                store.record(self.target_ip, self.target_port, index, counters[2 * position], counters[2 * position + 1],
+                             width=widths[2 * position])
+            rx_rate, tx_rate = interface_rates[2 * position], interface_rates[2 * position + 1]
+            if not np.isnan(rx_rate) and not np.isnan(tx_rate):
+                samples[index] = (float(rx_rate), float(tx_rate))
+        return samples
+
+
+class NetworkTrafficWindow(QMainWindow):
+    trap_signal = pyqtSignal(object)  # TrapEvents, emitted from the receiver's thread
+
+    def __init__(self, target, port, history=10, trap_port=None, settings=None):
+        super().__init__()
+        self.setWindowTitle("Network Traffic Visualization")
+        self.setGeometry(100, 100, 800, 600)
+
+        # Central Widget
+        self.central_widget = QWidget()
+        self.setCentralWidget(self.central_widget)
+
+        # Layout for the main widget
+        layout = QVBoxLayout(self.central_widget)
+
+        # Status Label
+        self.status_label = QLabel(f"Monitoring: {target}:{port}")
+        self.status_label.setStyleSheet("font-size: 14px; font-weight: bold; color: green;")
+        layout.addWidget(self.status_label)
+
+        # Matplotlib Figure
+        self.figure = Figure(figsize=(8, 6))
+        self.canvas = FigureCanvas(self.figure)
+        layout.addWidget(self.canvas)
+
+        # SNMP Data, polled every 10 seconds by a background thread
+        self.target_ip = target
+        self.target_port = port
+        self.history = history
+        self.interfaces = []
+        self.poll_thread = TrafficPollThread(self.target_ip, self.target_port, settings=settings)
+        self.poll_thread.interfaces_signal.connect(self.set_interfaces)
+        self.poll_thread.sample_signal.connect(self.update_data)
+        self.poll_thread.start()
+
+        # Link traps from the device trigger an immediate poll (trap_port 0 disables this)
+        self.trap_receiver = None
+        self.trap_signal.connect(self.handle_trap)
+        if trap_port != 0:
+            from trap_receiver import TrapReceiver, TRAP_PORT
+            try:
+                self.trap_receiver = TrapReceiver(self.trap_signal.emit, port=trap_port or TRAP_PORT).start()
+            except OSError as e:
+                print(f"Trap receiver not started: {e}")
+
+    def handle_trap(self, event):
+        from trap_receiver import describe
+        if self.target_ip not in (event.ip, event.agent):
+            return
+        self.status_label.setText(f"{describe(event)} at {time.strftime('%H:%M:%S', time.localtime(event.received))}")
+        self.poll_thread.poll_now()
+
+    def set_interfaces(self, interfaces):
+        if not interfaces:
+            self.status_label.setText("No interfaces found. Check SNMP service or OID support.")
+            return
+
+        self.interfaces = interfaces
+        self.status_label.setText(f"Available Interfaces: {', '.join(map(str, self.interfaces))}")
+        # One ring buffer of (time, received, sent) rows per interface, `history` samples long
+        self.data = {index: RingBuffer(self.history, 3) for index in self.interfaces}
+        self.init_plot()
+
+    def update_data(self, now, samples):
+        timestamp = time.strftime('%H:%M:%S', time.localtime(now))
+        for index, (rx_rate, tx_rate) in samples.items():
+            self.data[index].append((now, rx_rate, tx_rate))
+            print(f"Interface {index} - Time: {timestamp}, Received: {rx_rate:.1f} B/s, Sent: {tx_rate:.1f} B/s")
+        self.update_plot()
+
+    def init_plot(self):
+        """
+        Create the axes and one pair of lines per interface; update_plot only
+        feeds them new data.
+        """
+        self.ax = self.figure.add_subplot(111)
+        self.lines = {}
+        for index in self.interfaces:
+            received, = self.ax.plot(
+                [], [],
+                label=f"Interface {index} - Received",
+                marker='o',
+                linestyle='-',
+                linewidth=2,
+                color='blue'
+            )
+            sent, = self.ax.plot(
+                [], [],
+                label=f"Interface {index} - Sent",
+                marker='x',
+                linestyle='--',
+                linewidth=2,
+                color='green'
+            )
+            self.lines[index] = (received, sent)
+        self.ax.set_title("Network Traffic", fontsize=16, fontweight="bold")
+        self.ax.set_xlabel("Time", fontsize=12)
+        self.ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: time.strftime('%H:%M:%S', time.localtime(x))))
+        self.ax.set_ylabel("Bytes/s", fontsize=12)
+        self.ax.grid(True, linestyle="--", alpha=0.6)
+        self.ax.legend(fontsize=10, loc="upper left")
+
+    def update_plot(self):
+        for index, (received, sent) in self.lines.items():
+            samples = self.data[index].values()
+            received.set_data(samples[:, TIME], samples[:, RECEIVED])
+            sent.set_data(samples[:, TIME], samples[:, SENT])
+        self.ax.relim()
+        self.ax.autoscale_view()
+        # Coalesces with any pending repaint instead of rendering synchronously
+        self.canvas.draw_idle()
+
+    def closeEvent(self, event):
+        if self.trap_receiver is not None:
+            self.trap_receiver.stop()
+        self.poll_thread.stop()
+        self.poll_thread.wait()
+        super().closeEvent(event)
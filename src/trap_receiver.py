@@ -0,0 +1,264 @@
+"""
+SNMP trap and inform receiver, plus a small sender to test it locally.
+
+    python trap_receiver.py listen --port 16162
+    python trap_receiver.py send linkDown --if-index 3 --port 16162
+    python trap_receiver.py send coldStart --inform
+"""
+import argparse
+import asyncio
+import socket
+import threading
+import time
+from collections import namedtuple
+from pyasn1.codec.ber import decoder, encoder
+from pysnmp.proto import api, rfc1902
+from snmp_values import decode_value
+from metrics import metrics
+
+
+# Unprivileged default; agents have to be pointed at it (trap2sink host:16162)
+TRAP_PORT = 16162
+
+SNMP_TRAPS = '1.3.6.1.6.3.1.1.5'
+SYS_UPTIME_OID = '1.3.6.1.2.1.1.3.0'
+SNMP_TRAP_OID = '1.3.6.1.6.3.1.1.4.1.0'
+IF_INDEX_OID = '1.3.6.1.2.1.2.2.1.1'
+# RFC 3584 snmpTrapAddress, the agent's own address in forwarded SNMPv2 traps
+SNMP_TRAP_ADDRESS_OID = '1.3.6.1.6.3.18.1.3.0'
+
+TRAP_NAMES = {
+    f'{SNMP_TRAPS}.1': 'coldStart',
+    f'{SNMP_TRAPS}.2': 'warmStart',
+    f'{SNMP_TRAPS}.3': 'linkDown',
+    f'{SNMP_TRAPS}.4': 'linkUp',
+    f'{SNMP_TRAPS}.5': 'authenticationFailure',
+    f'{SNMP_TRAPS}.6': 'egpNeighborLoss',
+}
+TRAP_OIDS = {name: oid for oid, name in TRAP_NAMES.items()}
+
+# ip/port are where the datagram came from (port is usually ephemeral), agent
+# is the SNMPv1 agent-addr (for SNMPv2c the snmpTrapAddress varbind, or ip), varbinds maps OID -> decoded value (see snmp_values)
+TrapEvent = namedtuple("TrapEvent", ["ip", "port", "agent", "version", "trap_oid", "name", "uptime",
+                                     "varbinds", "received"])
+
+
+
+def if_index(event):
+    """
+    The ifIndex a linkUp/linkDown event is about, or None.
+    """
+    for oid, value in event.varbinds.items():
+        if oid.startswith(IF_INDEX_OID + '.') and isinstance(value, int):
+            return value
+    return None
+
+
+def describe(event):
+    if_number = if_index(event)
+    return event.name if if_number is None else f"{event.name} ifIndex {if_number}"
+
+
+def parse_message(message, address, communities=None):
+    """
+    Decode one datagram. Returns (TrapEvent or None, response bytes or None);
+    informs get a response, traps and anything else do not.
+    """
+    version = int(api.decodeMessageVersion(message))
+    pMod = api.protoModules[version]
+    request, _ = decoder.decode(message, asn1Spec=pMod.Message())
+    if communities and str(pMod.apiMessage.getCommunity(request)) not in communities:
+        return None, None
+    pdu = pMod.apiMessage.getPDU(request)
+    response = None
+
+    if version == api.protoVersion1:
+        if not pdu.isSameTypeWith(pMod.TrapPDU()):
+            return None, None
+        generic = int(pMod.apiTrapPDU.getGenericTrap(pdu))
+        if generic < 6:
+            trap_oid = f"{SNMP_TRAPS}.{generic + 1}"
+        else:
+            # RFC 3584: enterprise-specific traps become enterprise.0.specific
+            enterprise = pMod.apiTrapPDU.getEnterprise(pdu).prettyPrint()
+            trap_oid = f"{enterprise}.0.{int(pMod.apiTrapPDU.getSpecificTrap(pdu))}"
+        agent = pMod.apiTrapPDU.getAgentAddr(pdu).prettyPrint()
+        uptime = int(pMod.apiTrapPDU.getTimeStamp(pdu))
+        varbinds = {str(name): decode_value(value) for name, value in pMod.apiTrapPDU.getVarBinds(pdu)}
+    else:
+        if pdu.isSameTypeWith(pMod.InformRequestPDU()):
+            response = pMod.apiMessage.getResponse(request)
+            pMod.apiPDU.setVarBinds(pMod.apiMessage.getPDU(response), pMod.apiPDU.getVarBinds(pdu))
+            response = encoder.encode(response)
+        elif not pdu.isSameTypeWith(pMod.SNMPv2TrapPDU()):
+            return None, None
+        varbinds = {str(name): decode_value(value) for name, value in pMod.apiPDU.getVarBinds(pdu)}
+        trap_oid = varbinds.pop(SNMP_TRAP_OID, None)
+        uptime = varbinds.pop(SYS_UPTIME_OID, None)
+        uptime = uptime if isinstance(uptime, int) else None
+        agent = varbinds.get(SNMP_TRAP_ADDRESS_OID) or address[0]
+
+    event = TrapEvent(address[0], address[1], agent, version, trap_oid, TRAP_NAMES.get(trap_oid, trap_oid),
+                      uptime, varbinds, time.time())
+    return event, response
+
+
+class TrapProtocol(asyncio.DatagramProtocol):
+    def __init__(self, callback, communities, registry):
+        self.callback = callback
+        self.communities = communities
+        self.registry = registry
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            event, response = parse_message(data, addr, self.communities)
+        except Exception as e:
+            self.registry.count_error("trap", type(e).__name__)
+            return
+        if response is not None:
+            self.transport.sendto(response, addr)
+        if event is not None:
+            self.callback(event)
+
+
+class TrapReceiver:
+    """
+    Listens for traps and informs on a background thread and calls
+    `callback(event)` there for each one; Qt code can pass a signal's emit.
+    Informs are acknowledged. Only `communities` are accepted (None: any).
+    """
+    def __init__(self, callback, host='0.0.0.0', port=TRAP_PORT, communities=('public',), registry=metrics):
+        self.callback = callback
+        self.host = host
+        self.port = port
+        self.communities = set(communities) if communities else None
+        self.registry = registry
+        self._loop = None
+        self._thread = None
+
+    def start(self, timeout=5):
+        """
+        Start listening; raises OSError if the port cannot be bound.
+        """
+        ready = threading.Event()
+        failure = []
+
+        def run():
+            loop = self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                transport, _ = loop.run_until_complete(loop.create_datagram_endpoint(
+                    lambda: TrapProtocol(self.callback, self.communities, self.registry),
+                    local_addr=(self.host, self.port)))
+            except OSError as e:
+                failure.append(e)
+                ready.set()
+                loop.close()
+                return
+            ready.set()
+            try:
+                loop.run_forever()
+            finally:
+                transport.close()
+                loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait(timeout)
+        if failure:
+            raise failure[0]
+        return self
+
+    def stop(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+        self._thread = None
+
+
+def send_trap(name, host='127.0.0.1', port=TRAP_PORT, if_index=None, community='public', version=1,
+              inform=False, uptime=None, timeout=1.0):
+    """
+    Send one trap (or inform, SNMPv2c only) by name or OID, e.g. "linkDown".
+    Returns True when sent, or for an inform, when it was acknowledged.
+    """
+    trap_oid = TRAP_OIDS.get(name, name)
+    uptime = int(time.monotonic() * 100) & 0xFFFFFFFF if uptime is None else uptime
+    varBinds = []
+    if if_index is not None:
+        varBinds.append((rfc1902.ObjectName(f"{IF_INDEX_OID}.{if_index}"), rfc1902.Integer32(if_index)))
+
+    pMod = api.protoModules[api.protoVersion1 if version == 0 else api.protoVersion2c]
+    if version == 0:
+        pdu = pMod.TrapPDU()
+        pMod.apiTrapPDU.setDefaults(pdu)
+        if trap_oid.startswith(SNMP_TRAPS + '.'):
+            pMod.apiTrapPDU.setGenericTrap(pdu, int(trap_oid.rsplit('.', 1)[1]) - 1)
+        else:
+            enterprise, _, specific = trap_oid.rpartition('.0.')
+            pMod.apiTrapPDU.setEnterprise(pdu, enterprise)
+            pMod.apiTrapPDU.setGenericTrap(pdu, 6)
+            pMod.apiTrapPDU.setSpecificTrap(pdu, int(specific))
+        pMod.apiTrapPDU.setTimeStamp(pdu, uptime)
+        pMod.apiTrapPDU.setVarBinds(pdu, varBinds)
+    else:
+        pdu = pMod.InformRequestPDU() if inform else pMod.SNMPv2TrapPDU()
+        pMod.apiPDU.setDefaults(pdu)
+        pMod.apiPDU.setVarBinds(pdu, [(rfc1902.ObjectName(SYS_UPTIME_OID), rfc1902.TimeTicks(uptime)),
+                                      (rfc1902.ObjectName(SNMP_TRAP_OID), rfc1902.ObjectIdentifier(trap_oid))]
+                                + varBinds)
+    message = pMod.Message()
+    pMod.apiMessage.setDefaults(message)
+    pMod.apiMessage.setCommunity(message, community)
+    pMod.apiMessage.setPDU(message, pdu)
+
+    with socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        sock.sendto(encoder.encode(message), (host, port))
+        if not inform or version == 0:
+            return True
+        try:
+            sock.recvfrom(65535)
+        except socket.timeout:
+            return False
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receive or send SNMP traps.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    listen = commands.add_parser("listen", help="print traps as they arrive")
+    listen.add_argument("--host", default='0.0.0.0')
+    listen.add_argument("--port", type=int, default=TRAP_PORT)
+    send = commands.add_parser("send", help="send one trap")
+    send.add_argument("name", help="coldStart, warmStart, linkDown, linkUp, ... or a trap OID")
+    send.add_argument("--host", default='127.0.0.1')
+    send.add_argument("--port", type=int, default=TRAP_PORT)
+    send.add_argument("--if-index", type=int)
+    send.add_argument("--community", default='public')
+    send.add_argument("--version", type=int, choices=(0, 1), default=1)
+    send.add_argument("--inform", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "send":
+        sent = send_trap(args.name, args.host, args.port, args.if_index, args.community, args.version, args.inform)
+        print("Sent" if sent else "No acknowledgement")
+        return
+
+    receiver = TrapReceiver(lambda event: print(f"{event.ip}:{event.port} {describe(event)} {event.varbinds}",
+                                                flush=True),
+                            args.host, args.port).start()
+    print(f"Listening on {args.host}:{args.port}, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        receiver.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import pytest
+from agent_farm import AgentFarm
+
+FARM_PORT = 23101
+
+
+@pytest.fixture(scope="session")
+def farm():
+    """
+    Two simulated agents with 4 interfaces each, served from a thread.
+    """
+    with AgentFarm(2, FARM_PORT, processes=0) as farm:
+        yield farm
@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from async_poller import AsyncPoller, close_loop
+from metrics import Metrics
+
+
+async def echo_port(poller, ip, port):
+    return port
+
+
+def poll(poller, targets, job):
+    async def collect():
+        return [item async for item in poller.poll(targets, job)]
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(collect())
+    finally:
+        poller.close()
+        loop.close()
+
+
+def test_poll_yields_every_target():
+    results = poll(AsyncPoller(limit=4, registry=Metrics()), [("127.0.0.1", port) for port in range(10)], echo_port)
+    assert sorted(results) == [("127.0.0.1", port, port) for port in range(10)]
+
+
+def test_poll_reports_failed_jobs_as_none(capsys):
+    async def job(poller, ip, port):
+        if port % 2:
+            raise KeyError(port)
+        return port
+
+    results = poll(AsyncPoller(limit=4, registry=Metrics()), [("127.0.0.1", port) for port in range(6)], job)
+    assert sorted(results) == [("127.0.0.1", 0, 0), ("127.0.0.1", 1, None), ("127.0.0.1", 2, 2),
+                               ("127.0.0.1", 3, None), ("127.0.0.1", 4, 4), ("127.0.0.1", 5, None)]
+    # Reported once per exception type
+    assert capsys.readouterr().err.count("KeyError") == 1
+
+
+def test_poll_raises_errors_from_targets():
+    def targets():
+        yield ("127.0.0.1", 1)
+        raise ValueError("Malformed target")
+
+    with pytest.raises(ValueError, match="Malformed target"):
+        poll(AsyncPoller(limit=4, registry=Metrics()), targets(), echo_port)
+
+
+def test_close_loop_finishes_pending_tasks():
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(asyncio.sleep(3600))
+    loop.run_until_complete(asyncio.sleep(0))
+    close_loop(loop)
+    assert task.cancelled() and loop.is_closed()
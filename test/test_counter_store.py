@@ -0,0 +1,94 @@
+import sqlite3
+import time
+import numpy as np
+import pytest
+from counter_store import CounterStore
+from rates import counter_rates
+
+COUNTER32 = 2 ** 32
+T0 = (int(time.time()) // 3600 - 2) * 3600  # An hour boundary, well within the raw retention
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CounterStore(str(tmp_path / "counters.db"))
+    yield store
+    store.close()
+
+
+def test_raw_samples_keep_their_width(store):
+    store.record('127.0.0.1', 16101, 1, 100, 200, ts=T0, width=32)
+    store.record('127.0.0.1', 16101, 1, 150, 260, ts=T0 + 10)
+    assert store.query('127.0.0.1', 16101, 1, T0, T0 + 10, "raw") == [(T0, 100, 200, 32), (T0 + 10, 150, 260, 64)]
+    assert store.query('127.0.0.1', 16101, 2, T0, T0 + 10, "raw") == []
+
+
+def test_buckets_keep_their_last_sample_across_a_wrap(store):
+    # 1000 bytes/s on a Counter32 that wraps in the second minute
+    start = COUNTER32 - 90_000
+    for step in range(18):
+        value = (start + step * 10_000) % COUNTER32
+        store.record('127.0.0.1', 16101, 1, value, value, ts=T0 + step * 10, width=32)
+    rows = store.query('127.0.0.1', 16101, 1, T0, T0 + 180, "1m")
+    assert [row[0] for row in rows] == [T0 + 50, T0 + 110, T0 + 170]
+    assert rows[1][1] == (start + 11 * 10_000) % COUNTER32 < rows[0][1]
+    assert all(row[3] == 32 for row in rows)
+    times, rx, tx, widths = (np.array(column) for column in zip(*rows))
+    rates = counter_rates(np.stack([rx, tx], axis=1), times, widths[:, None])
+    assert np.allclose(rates, 1000)
+
+
+def test_hour_tier_rolls_up_the_minute_tier(store):
+    for step in range(12):
+        store.record('127.0.0.1', 16101, 1, step, 2 * step, ts=T0 + step * 600)
+    store.flush()
+    rows = store.query('127.0.0.1', 16101, 1, T0 - T0 % 3600, T0 + 7200, "1h")
+    assert rows == [(T0 + 5 * 600, 5, 10, 64), (T0 + 11 * 600, 11, 22, 64)]
+    n = store.conn.execute("SELECT SUM(n) FROM samples_1h").fetchone()[0]
+    assert n == 12
+
+
+def test_late_samples_update_their_bucket(store):
+    store.record('127.0.0.1', 16101, 1, 10, 10, ts=T0 + 30)
+    store.flush()
+    store.record('127.0.0.1', 16101, 1, 5, 5, ts=T0 + 5)
+    store.record('127.0.0.1', 16101, 1, 20, 20, ts=T0 + 50)
+    assert store.query('127.0.0.1', 16101, 1, T0, T0, "1m") == [(T0 + 50, 20, 20, 64)]
+
+
+def test_prune_applies_each_tier_retention(tmp_path):
+    store = CounterStore(str(tmp_path / "counters.db"), retention={"raw": 100, "1m": 1000, "1h": 10_000},
+                         prune_interval=float('inf'))
+    for ts in (T0, T0 + 500, T0 + 5000):
+        store.record('127.0.0.1', 16101, 1, ts, ts, ts=ts)
+    store.flush()
+    store.prune(now=T0 + 5050)
+    assert [row[0] for row in store.query('127.0.0.1', 16101, 1, 0, T0 + 5050, "raw")] == [T0 + 5000]
+    assert [row[0] for row in store.query('127.0.0.1', 16101, 1, 0, T0 + 5050, "1m")] == [T0 + 5000]
+    assert len(store.query('127.0.0.1', 16101, 1, 0, T0 + 5050, "1h")) == 2
+    store.close()
+
+
+def test_min_max_stores_are_migrated(tmp_path):
+    path = str(tmp_path / "counters.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE series (id INTEGER PRIMARY KEY, ip TEXT NOT NULL, port INTEGER NOT NULL, "
+                 "ifIndex INTEGER NOT NULL, UNIQUE(ip, port, ifIndex))")
+    conn.execute("CREATE TABLE samples (series INTEGER NOT NULL, ts INTEGER NOT NULL, rx INTEGER, tx INTEGER, "
+                 "PRIMARY KEY (series, ts)) WITHOUT ROWID")
+    for tier in ("1m", "1h"):
+        conn.execute(f"CREATE TABLE samples_{tier} (series INTEGER NOT NULL, ts INTEGER NOT NULL, n INTEGER, "
+                     "rx_min INTEGER, rx_max INTEGER, tx_min INTEGER, tx_max INTEGER, "
+                     "PRIMARY KEY (series, ts)) WITHOUT ROWID")
+    conn.execute("INSERT INTO series VALUES (1, '127.0.0.1', 16101, 1)")
+    conn.execute("INSERT INTO samples VALUES (1, ?, 7, 8)", (T0,))
+    conn.execute("INSERT INTO samples_1m VALUES (1, ?, 6, 1, 7, 2, 8)", (T0,))
+    conn.commit()
+    conn.close()
+
+    store = CounterStore(path)
+    assert store.query('127.0.0.1', 16101, 1, T0, T0, "raw") == [(T0, 7, 8, None)]
+    assert store.query('127.0.0.1', 16101, 1, T0, T0, "1m") == [(T0, 7, 8, None)]
+    store.record('127.0.0.1', 16101, 1, 9, 10, ts=T0 + 10, width=32)
+    assert store.query('127.0.0.1', 16101, 1, T0, T0, "1m") == [(T0 + 10, 9, 10, 32)]
+    store.close()
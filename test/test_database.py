@@ -0,0 +1,63 @@
+import sqlite3
+import pytest
+
+pytest.importorskip("PyQt5")
+from task3gui import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "hosts.db"))
+    yield manager
+    manager.conn.close()
+
+
+def add_hosts(db, *addresses):
+    with db.conn:
+        db.conn.executemany("INSERT INTO hosts (ip, port) VALUES (?, ?)", addresses)
+    return {(ip, port): host_id for host_id, ip, port in db.conn.execute("SELECT id, ip, port FROM hosts")}
+
+
+def test_trap_from_the_polled_address(db):
+    ids = add_hosts(db, ('127.0.0.1', 16101), ('127.0.0.1', 16102))
+    assert db.find_trap_host('127.0.0.1', 16102, '127.0.0.1') == (ids[('127.0.0.1', 16102)], '127.0.0.1', 16102)
+
+
+def test_trap_from_an_ephemeral_port_is_not_spread_over_the_address(db):
+    add_hosts(db, ('127.0.0.1', 16101), ('127.0.0.1', 16102))
+    assert db.find_trap_host('127.0.0.1', 40000, '127.0.0.1') is None
+
+
+def test_trap_matched_by_agent_address(db):
+    ids = add_hosts(db, ('127.0.0.1', 16101), ('172.19.16.5', 161))
+    assert db.find_trap_host('127.0.0.1', 40000, '172.19.16.5') == (ids[('172.19.16.5', 161)], '172.19.16.5', 161)
+
+
+def test_trap_from_the_only_host_at_an_address(db):
+    ids = add_hosts(db, ('172.19.16.5', 161), ('172.19.16.6', 161))
+    assert db.find_trap_host('172.19.16.6', 40000, '172.19.16.6') == (ids[('172.19.16.6', 161)], '172.19.16.6', 161)
+    assert db.find_trap_host('172.19.16.7', 40000, '172.19.16.7') is None
+
+
+def test_baseline_hosts_table_is_migrated(tmp_path):
+    path = str(tmp_path / "hosts.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE hosts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, ip TEXT NOT NULL, port INTEGER NOT NULL, sysDescr TEXT,
+            sysName TEXT, sysUpTime TEXT, sysLocation TEXT, customData TEXT DEFAULT '', lastUpdated TEXT,
+            UNIQUE(ip, port) ON CONFLICT REPLACE)
+        """)
+    conn.executemany("INSERT INTO hosts (ip, port, sysName, sysUpTime, customData) VALUES (?, ?, ?, ?, ?)",
+                     [('127.0.0.1', 16101, 'a', '4200', 'rack 1'), ('127.0.0.1', 16102, 'b', 'N/A', '')])
+    conn.commit()
+    conn.close()
+
+    db = DatabaseManager(path)
+    columns = {row[1]: row[2] for row in db.conn.execute("PRAGMA table_info(hosts)")}
+    assert columns["sysUpTime"] == "INTEGER" and "lastSeen" in columns and "lastEvent" in columns
+    assert db.conn.execute("SELECT id, sysUpTime, customData FROM hosts ORDER BY id").fetchall() == [
+        (1, 4200, 'rack 1'), (2, None, '')]
+    # Ids carry on from the migrated rows
+    assert db.upsert_hosts([('127.0.0.1', 16103, 'c', 'c', 99, 'lab')]) == [3]
+    db.conn.close()
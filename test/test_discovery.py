@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from async_poller import AsyncPoller
+from discovery import MIB2_OID, split_subtree, walk_subtree, walk_subtrees
+from metrics import Metrics
+
+IF_DESCR = '1.3.6.1.2.1.2.2.1.2'
+
+
+def run(job, **options):
+    poller = AsyncPoller(registry=Metrics(), **options)
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(job(poller))
+    finally:
+        poller.close()
+        loop.close()
+
+
+def test_split_subtree():
+    assert split_subtree(MIB2_OID)[:2] == [(None, f"{MIB2_OID}.2"), (f"{MIB2_OID}.2", f"{MIB2_OID}.3")]
+    assert split_subtree(MIB2_OID)[-1] == (f"{MIB2_OID}.47", None)
+    # Anything else may end in instances, so it is one range
+    assert split_subtree(IF_DESCR) == [(None, None)]
+    assert split_subtree('1.3.6.1.2.1.2', arcs=(2,)) == [(None, '1.3.6.1.2.1.2.2'), ('1.3.6.1.2.1.2.2', None)]
+
+
+@pytest.mark.parametrize("version", [0, 1])
+def test_walk_subtrees_walks_a_whole_column(farm, version):
+    ip, port = '127.0.0.1', farm.ports[0]
+    rows = []
+    count = run(lambda poller: walk_subtrees(poller, ip, port, [IF_DESCR],
+                                             lambda *block: rows.append(block)), version=version)
+    assert count == 4
+    assert [(oid, value) for *_, block in rows for oid, value in block] == [
+        (f"{IF_DESCR}.1", "lo"), (f"{IF_DESCR}.2", "eth0"), (f"{IF_DESCR}.3", "eth1"), (f"{IF_DESCR}.4", "eth2")]
+    assert all(block[:3] == (ip, port, IF_DESCR) for block in rows)
+
+
+def test_split_walk_matches_a_single_chain(farm):
+    ip, port = '127.0.0.1', farm.ports[1]
+    rows = []
+    count = run(lambda poller: walk_subtrees(poller, ip, port, [MIB2_OID],
+                                             lambda *block: rows.extend(block[3])))
+    chain = run(lambda poller: walk_subtree(poller, ip, port, MIB2_OID))
+    assert count == len(chain) == len(rows)
+    # Counters move between the two walks, the OIDs do not
+    assert sorted(oid for oid, _ in rows) == sorted(oid for oid, _ in chain)
+
+
+def test_walk_range(farm):
+    ip, port = '127.0.0.1', farm.ports[0]
+    rows = []
+    count = run(lambda poller: poller.walk(ip, port, '1.3.6.1.2.1.2.2.1', rows.extend,
+                                           start=f"{IF_DESCR}.2", stop='1.3.6.1.2.1.2.2.1.6'))
+    assert count == 2
+    assert rows == [(f"{IF_DESCR}.3", "eth1"), (f"{IF_DESCR}.4", "eth2")]
@@ -0,0 +1,60 @@
+import pytest
+from inventory import Target, Inventory, parse_ports, parse_spec, find_target, snmp_settings
+
+
+def test_parse_ports():
+    assert parse_ports("161") == [range(161, 162)]
+    assert parse_ports("161,16101-16103") == [range(161, 162), range(16101, 16104)]
+
+
+def test_parse_spec_expands_hosts_and_ports():
+    assert list(parse_spec("10.0.0.5")) == [Target("10.0.0.5", 161)]
+    assert list(parse_spec("10.0.0.1-10.0.0.2:161,162")) == [
+        Target("10.0.0.1", 161), Target("10.0.0.1", 162), Target("10.0.0.2", 161), Target("10.0.0.2", 162)]
+    assert [target.ip for target in parse_spec("10.0.0.0/30")] == ["10.0.0.1", "10.0.0.2"]
+    assert list(parse_spec("[::1]:16101")) == [Target("::1", 16101)]
+
+
+def test_parse_spec_options():
+    target, = parse_spec("127.0.0.1:16101 version=3 user=monitor auth=sha:secret1 priv=aes:secret2 timeout=0.5")
+    assert target == Target("127.0.0.1", 16101, version=3, timeout=0.5, user="monitor", auth="sha:secret1",
+                            priv="aes:secret2")
+
+
+def test_parse_spec_is_lazy():
+    targets = parse_spec("10.0.0.0/8")
+    assert next(targets) == Target("10.0.0.1", 161)
+
+
+@pytest.mark.parametrize("spec", ["127.0.0.1:2160x", "127.0.0.256", "10.0.0.0/33", "127.0.0.1 colour=red",
+                                  "127.0.0.1 version=three", "127.0.0.1 version=3 user=monitor priv=aes:secret2"])
+def test_parse_spec_rejects_malformed_specs_at_once(spec):
+    with pytest.raises(ValueError):
+        parse_spec(spec)
+
+
+def test_inventory_from_specs_validates_eagerly():
+    with pytest.raises(ValueError):
+        Inventory.from_specs(["127.0.0.1:16101", "127.0.0.1:2160x"])
+    inventory = Inventory.from_specs("127.0.0.1:16101-16102") + Inventory.from_specs("127.0.0.2")
+    assert [(target.ip, target.port) for target in inventory] == [
+        ("127.0.0.1", 16101), ("127.0.0.1", 16102), ("127.0.0.2", 161)]
+    # Iterating twice expands the specs again
+    assert len(list(inventory)) == 3
+
+
+def test_inventory_from_file(tmp_path):
+    path = tmp_path / "targets.txt"
+    path.write_text("# lab\n127.0.0.1:16101-16102 community=private\n\n10.0.0.5  # core\n", encoding="utf-8")
+    assert list(Inventory.from_file(str(path))) == [
+        Target("127.0.0.1", 16101, "private"), Target("127.0.0.1", 16102, "private"), Target("10.0.0.5", 161)]
+
+
+def test_find_target_and_snmp_settings():
+    targets = list(parse_spec("127.0.0.1:16101-16102 version=3 user=monitor auth=md5:secret1"))
+    target = find_target(targets, "127.0.0.1", 16102)
+    assert snmp_settings(target) == {"community": "public", "version": 3,
+                                     "credentials": ("monitor", "md5:secret1", None)}
+    assert find_target(targets, "127.0.0.1", 161) == Target("127.0.0.1", 161)
+    assert snmp_settings(Target("127.0.0.1", 161), version=0) == {"community": "public", "version": 0,
+                                                                   "credentials": None}
@@ -0,0 +1,49 @@
+import numpy as np
+from rates import counter_rates, RateEngine
+
+COUNTER32 = 2 ** 32
+COUNTER64 = 2 ** 64
+
+
+def test_rates_from_deltas():
+    rates = counter_rates([[0, 100], [1000, 300], [3000, 300]], [0, 10, 20], 64)
+    assert np.array_equal(rates, [[100, 20], [200, 0]])
+
+
+def test_counter32_wrap():
+    rates = counter_rates([[COUNTER32 - 500], [500]], [0, 10], [32])
+    assert np.array_equal(rates, [[100]])
+
+
+def test_counter64_wrap():
+    rates = counter_rates([[COUNTER64 - 500], [500]], [0, 10], [64])
+    assert np.array_equal(rates, [[100]])
+
+
+def test_width_change_is_not_a_rate():
+    # The agent answered ifHCInOctets, then only ifInOctets
+    rates = counter_rates([[5_000_000_000], [1000], [2000]], [0, 10, 20], [[64], [32], [32]])
+    assert np.isnan(rates[0, 0]) and rates[1, 0] == 100
+
+
+def test_missing_readings_and_bad_timestamps():
+    rates = counter_rates([[0, 0], [10, 10], [20, 20], [30, 30]], [0, 1, 1, 2], 64,
+                          valid=[[True, True], [True, False], [True, True], [True, True]])
+    assert rates[0, 0] == 10 and np.isnan(rates[0, 1])
+    assert np.isnan(rates[1]).all()  # No time passed
+    assert np.array_equal(rates[2], [10, 10])
+
+
+def test_reboot_is_not_a_wrap():
+    rates = counter_rates([[COUNTER32 - 500], [500], [1500]], [0, 10, 20], 32, uptimes=[9000, 100, 1100])
+    assert np.isnan(rates[0, 0]) and rates[1, 0] == 100
+
+
+def test_rate_engine():
+    engine = RateEngine(2)
+    assert np.isnan(engine.update([COUNTER32 - 100, 0], 0, [32, 64], uptime=100)).all()
+    assert np.array_equal(engine.update([100, 50], 2, [32, 64], uptime=300), [100, 25])
+    rates = engine.update([200, 100], 4, [32, 64], valid=[True, False], uptime=500)
+    assert rates[0] == 50 and np.isnan(rates[1])
+    # Rebooted: sysUpTime went backwards
+    assert np.isnan(engine.update([10, 10], 6, [32, 64], uptime=50)).all()
@@ -0,0 +1,74 @@
+import asyncio
+from async_poller import AsyncPoller
+from metrics import Metrics
+from result_cache import ResultCache, SYS_UPTIME_OID
+
+AGENT = ('127.0.0.1', 16101)
+SYS_DESCR = '1.3.6.1.2.1.1.1.0'
+SYS_NAME = '1.3.6.1.2.1.1.5.0'
+IF_PHYS_ADDRESS = '1.3.6.1.2.1.2.2.1.6.3'
+
+
+def test_ttl_by_longest_prefix():
+    cache = ResultCache(ttls={'1.3.6.1.2.1.1': 10, '1.3.6.1.2.1.1.5': 60})
+    assert cache.ttl(SYS_DESCR) == 10
+    assert cache.ttl(SYS_NAME) == 60
+    assert cache.ttl('1.3.6.1.2.1.1.50.0') == 10  # Not under the .1.5 prefix
+    assert cache.ttl(SYS_UPTIME_OID) == 10
+    assert cache.ttl('1.3.6.1.2.1.2.2.1.10.1') is None
+
+
+def test_values_expire():
+    cache = ResultCache()
+    cache.update(AGENT, {SYS_NAME: "edge-1", SYS_UPTIME_OID: 100, IF_PHYS_ADDRESS: b"\x00\x1a"}, now=0)
+    assert len(cache) == 2  # sysUpTime is never cached
+    assert cache.split(AGENT, [SYS_NAME, IF_PHYS_ADDRESS, SYS_UPTIME_OID], now=599) == (
+        {SYS_NAME: "edge-1", IF_PHYS_ADDRESS: b"\x00\x1a"}, [SYS_UPTIME_OID])
+    assert cache.split(AGENT, [SYS_NAME], now=600) == ({}, [SYS_NAME])
+    assert cache.split(('127.0.0.1', 16102), [SYS_NAME], now=0) == ({}, [SYS_NAME])
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_least_recently_used_values_go_first():
+    cache = ResultCache(max_entries=2)
+    cache.update(AGENT, {SYS_DESCR: "a", SYS_NAME: "b"}, now=0)
+    cache.split(AGENT, [SYS_DESCR], now=1)
+    cache.update(('127.0.0.1', 16102), {SYS_NAME: "c"}, now=1)
+    assert cache.split(AGENT, [SYS_DESCR, SYS_NAME], now=2) == ({SYS_DESCR: "a"}, [SYS_NAME])
+
+
+def test_reboot_forgets_the_agent():
+    cache = ResultCache()
+    cache.update(AGENT, {SYS_NAME: "edge-1"}, now=0)
+    assert not cache.observe_uptime(AGENT, 100)
+    assert not cache.observe_uptime(AGENT, 200)
+    assert not cache.observe_uptime(AGENT, None)
+    assert cache.observe_uptime(AGENT, 50)
+    assert len(cache) == 0
+
+
+def test_get_many_serves_cached_values_alongside_a_fresh_uptime():
+    poller = AsyncPoller(registry=Metrics(), cache=ResultCache())
+    agent = {SYS_NAME: "edge-1", SYS_UPTIME_OID: 100}
+    requests = []
+
+    async def fetch(ip, port, oids, max_varbinds):
+        requests.append(sorted(oids))
+        return {oid: agent[oid] for oid in oids}
+
+    def get(*oids):
+        return loop.run_until_complete(poller.get_many(*AGENT, oids))
+
+    poller._get_many = fetch
+    loop = asyncio.new_event_loop()
+    try:
+        assert get(SYS_NAME) == {SYS_NAME: "edge-1"}
+        agent[SYS_UPTIME_OID] = 200
+        assert get(SYS_NAME) == {SYS_NAME: "edge-1"}
+        # The agent rebooted and was renamed meanwhile
+        agent.update({SYS_NAME: "edge-2", SYS_UPTIME_OID: 10})
+        assert get(SYS_NAME) == {SYS_NAME: "edge-2"}
+    finally:
+        poller.close()
+        loop.close()
+    assert requests == [[SYS_NAME], [SYS_UPTIME_OID], [SYS_UPTIME_OID], [SYS_NAME]]
@@ -0,0 +1,40 @@
+import gzip
+import json
+import pytest
+from snapshot import SnapshotWriter, read_snapshot
+
+ROOT = '1.3.6.1.2.1'
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "mib2.ndjson.gz")
+    with SnapshotWriter(path) as writer:
+        writer.write('127.0.0.1', 16101, ROOT, [(f'{ROOT}.1.1.0', "Linux"), (f'{ROOT}.1.3.0', 4200)])
+        writer.write('127.0.0.1', 16102, f'{ROOT}.2', [(f'{ROOT}.2.2.1.6.1', b"\x00\x1a+<M^"),
+                                                       (f'{ROOT}.2.2.1.6.2', "0x001a"), (f'{ROOT}.2.2.1.6.3', None)])
+        writer.write('127.0.0.1', 16101, ROOT, [])
+    assert (writer.blocks, writer.varbinds) == (2, 5)
+    assert list(read_snapshot(path)) == [
+        ('127.0.0.1', 16101, f'{ROOT}.1.1.0', "Linux"),
+        ('127.0.0.1', 16101, f'{ROOT}.1.3.0', 4200),
+        ('127.0.0.1', 16102, f'{ROOT}.2.2.1.6.1', b"\x00\x1a+<M^"),
+        # A string that looks like hex stays a string
+        ('127.0.0.1', 16102, f'{ROOT}.2.2.1.6.2', "0x001a"),
+        ('127.0.0.1', 16102, f'{ROOT}.2.2.1.6.3', None),
+    ]
+
+
+def test_blocks_store_relative_oids(tmp_path):
+    path = str(tmp_path / "snapshot.ndjson.gz")
+    with SnapshotWriter(path) as writer:
+        writer.write('10.0.0.5', 161, ROOT, [(f'{ROOT}.2.2.1.10.1', 123), (f'{ROOT}.2.2.1.6.1', b"\x01")])
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        block, = (json.loads(line) for line in file)
+    assert block == {"ip": '10.0.0.5', "port": 161, "root": ROOT, "oids": ["2.2.1.10.1", "2.2.1.6.1"],
+                     "values": [123, {"hex": "01"}]}
+
+
+def test_unsupported_values_are_rejected(tmp_path):
+    with SnapshotWriter(str(tmp_path / "snapshot.ndjson.gz")) as writer:
+        with pytest.raises(TypeError):
+            writer.write('10.0.0.5', 161, ROOT, [(f'{ROOT}.1.1.0', object())])
@@ -0,0 +1,63 @@
+from pysnmp.proto.rfc1902 import Integer, Counter32, OctetString
+import pytest
+from snmp_client import split_oids, apply_response, get_supported_interfaces, TOO_BIG, NO_SUCH_NAME
+
+OIDS = [f"1.3.6.1.2.1.2.2.1.10.{index}" for index in range(1, 6)]
+
+
+def test_split_oids():
+    assert split_oids(OIDS, 2) == [OIDS[0:2], OIDS[2:4], OIDS[4:]]
+    assert split_oids(OIDS) == [OIDS]
+    assert split_oids([]) == []
+
+
+def test_answer_is_decoded():
+    results = {}
+    pending = []
+    apply_response(OIDS[:2], pending, results, Integer(0), Integer(0),
+                   [(OIDS[0], Counter32(10)), (OIDS[1], OctetString(b"eth0"))])
+    assert results == {OIDS[0]: 10, OIDS[1]: "eth0"}
+    assert pending == []
+
+
+def test_too_big_splits_the_chunk():
+    results = {}
+    pending = []
+    apply_response(OIDS, pending, results, Integer(TOO_BIG), Integer(0), [])
+    assert pending == [OIDS[:2], OIDS[2:]]
+    assert results == {}
+    # A single OID that is still too big has no value
+    pending = []
+    apply_response(OIDS[:1], pending, results, Integer(TOO_BIG), Integer(0), [])
+    assert pending == []
+    assert results == {OIDS[0]: None}
+
+
+def test_no_such_name_drops_only_that_oid():
+    results = {}
+    pending = []
+    apply_response(OIDS[:3], pending, results, Integer(NO_SUCH_NAME), Integer(2), [])
+    assert results == {OIDS[1]: None}
+    assert pending == [[OIDS[0], OIDS[2]]]
+    pending = []
+    apply_response(OIDS[:1], pending, results, Integer(NO_SUCH_NAME), Integer(1), [])
+    assert results[OIDS[0]] is None
+    assert pending == []
+
+
+def test_error_index_out_of_range():
+    for errorIndex in (0, 4, -1):
+        results = {}
+        pending = []
+        apply_response(OIDS[:3], pending, results, Integer(NO_SUCH_NAME), Integer(errorIndex), [])
+        assert results == dict.fromkeys(OIDS[:3])
+        assert pending == []
+    results = {}
+    apply_response(["a"], [], results, Integer(2), Integer(5), [])
+    assert results == {"a": None}
+
+
+@pytest.mark.parametrize("version", [0, 1])
+def test_get_supported_interfaces(farm, version):
+    # ifIndex 1 is the loopback
+    assert get_supported_interfaces('127.0.0.1', farm.ports[0], version=version) == [2, 3, 4]
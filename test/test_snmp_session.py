@@ -0,0 +1,41 @@
+import pytest
+from pysnmp.hlapi import usmHMACSHAAuthProtocol, usmHMACMD5AuthProtocol, usmAesCfb128Protocol, usmNoPrivProtocol
+from snmp_session import SessionPool, parse_key, master_key, usm_user, AUTH_PROTOCOLS
+
+
+def test_parse_key():
+    assert parse_key("md5:secret", AUTH_PROTOCOLS, "sha") == (usmHMACMD5AuthProtocol, "secret")
+    # Without a known protocol the whole text is the passphrase
+    assert parse_key("pass:word", AUTH_PROTOCOLS, "sha") == (usmHMACSHAAuthProtocol, "pass:word")
+
+
+def test_master_keys_are_hashed_once():
+    assert master_key(usmHMACSHAAuthProtocol, "authpass123") is master_key(usmHMACSHAAuthProtocol, "authpass123")
+
+
+def test_usm_user_security_levels():
+    assert usm_user(("monitor", None, None)).securityLevel == "noAuthNoPriv"
+    auth = usm_user(("monitor", "authpass123", None))
+    assert (auth.securityLevel, auth.authProtocol, auth.privProtocol) == (
+        "authNoPriv", usmHMACSHAAuthProtocol, usmNoPrivProtocol)
+    priv = usm_user(("monitor", "sha:authpass123", "privpass123"))
+    assert (priv.securityLevel, priv.privProtocol) == ("authPriv", usmAesCfb128Protocol)
+
+
+def test_usm_user_rejects_priv_without_auth():
+    with pytest.raises(ValueError):
+        usm_user(("monitor", None, "aes:privpass123"))
+
+
+def test_sessions_are_reused_and_evicted():
+    pool = SessionPool(idle_timeout=60)
+    session = pool.session("127.0.0.1", 16101, timeout=0.5)
+    assert pool.session("127.0.0.1", 16101) is session
+    # Community and version are part of the key; credentials only for SNMPv3
+    assert pool.session("127.0.0.1", 16101, version=0) is not session
+    assert pool.session("127.0.0.1", 16101, credentials=("monitor", None, None)) is session
+    assert pool.evict_idle() == 0
+    session.last_used -= 61
+    assert pool.evict_idle() == 1
+    assert len(pool) == 1
+    pool.close()
@@ -0,0 +1,33 @@
+from pysnmp.proto import rfc1155, rfc1902, rfc1905
+from snmp_values import decode_value, decode_octets, format_mac, to_text
+
+
+def test_numbers_decode_to_int():
+    for value in (rfc1902.Integer32(-5), rfc1902.Counter32(2 ** 32 - 1), rfc1902.Counter64(2 ** 64 - 1),
+                  rfc1902.Gauge32(7), rfc1902.TimeTicks(4200), rfc1155.Counter(3)):
+        assert decode_value(value) == int(value)
+        assert type(decode_value(value)) is int
+
+
+def test_octets_decode_to_text_or_bytes():
+    assert decode_value(rfc1902.OctetString(b"Linux snmp 5.15")) == "Linux snmp 5.15"
+    assert decode_value(rfc1902.OctetString(b"\x00\x1a+\x3c\x4d\x5e")) == b"\x00\x1a+\x3c\x4d\x5e"
+    assert decode_octets("café".encode("utf-8")) == "café"
+    assert decode_octets(b"\xff\xfe") == b"\xff\xfe"
+    assert decode_value(rfc1902.Opaque(b"text")) == b"text"
+
+
+def test_other_types():
+    assert decode_value(rfc1902.IpAddress("10.0.0.5")) == "10.0.0.5"
+    assert decode_value(rfc1902.ObjectIdentifier("1.3.6.1.2.1")) == "1.3.6.1.2.1"
+    assert decode_value(rfc1905.NoSuchInstance("")) is None
+    assert decode_value(rfc1905.EndOfMibView("")) is None
+
+
+def test_format_mac_and_to_text():
+    assert format_mac(b"\x00\x1a+\x3c\x4d\x5e") == "00:1A:2B:3C:4D:5E"
+    # A MAC made only of printable bytes arrives as text
+    assert format_mac("ABCDEF") == "41:42:43:44:45:46"
+    assert format_mac(b"") is None
+    assert to_text(b"\x01\x02") == "0x0102"
+    assert to_text(42) == 42
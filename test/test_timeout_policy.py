@@ -0,0 +1,66 @@
+import pytest
+from timeout_policy import TimeoutPolicy
+
+AGENT = ('127.0.0.1', 16101)
+
+
+def test_unknown_agents_get_the_initial_timeout():
+    policy = TimeoutPolicy(initial_timeout=1.0)
+    assert policy.timeout(AGENT) == 1.0
+    assert policy.retries(AGENT) == 1
+    assert policy.should_poll(AGENT)
+
+
+def test_timeout_follows_the_round_trip_time():
+    policy = TimeoutPolicy(min_timeout=0.01)
+    policy.record_success(AGENT, 0.12)
+    # srtt + 4 * rttvar = 0.12 + 4 * 0.06, rounded up to the timeout step
+    assert policy.timeout(AGENT) == pytest.approx(0.4)
+    for _ in range(50):
+        policy.record_success(AGENT, 0.12)
+    assert policy.timeout(AGENT) == pytest.approx(0.15)
+
+
+def test_timeouts_are_clamped_and_stepped():
+    policy = TimeoutPolicy(min_timeout=0.1, max_timeout=5.0)
+    policy.record_success(AGENT, 0.001)
+    assert policy.timeout(AGENT) == 0.1
+    policy.record_success(('127.0.0.1', 16102), 4.0)
+    assert policy.timeout(('127.0.0.1', 16102)) == 5.0
+    policy.record_success(('127.0.0.1', 16103), 0.123)
+    assert policy.timeout(('127.0.0.1', 16103)) == 0.4  # 0.123 + 4 * 0.0615 = 0.369
+
+
+def test_karns_rule_ignores_answers_after_the_timeout():
+    policy = TimeoutPolicy()
+    policy.record_success(AGENT, 0.1)
+    policy.record_success(AGENT, 2.0, timeout=1.0)
+    assert policy.agents[AGENT].srtt == 0.1
+
+
+def test_failures_back_off_and_quarantine():
+    policy = TimeoutPolicy(initial_timeout=0.5, quarantine_after=3, probe_interval=60, max_probe_interval=200)
+    policy.record_failure(AGENT, now=0)
+    assert policy.timeout(AGENT) == 1.0
+    assert policy.retries(AGENT) == 0
+    policy.record_failure(AGENT, now=0)
+    assert not policy.is_quarantined(AGENT)
+    policy.record_failure(AGENT, now=0)
+    assert policy.quarantined() == [AGENT]
+    assert not policy.should_poll(AGENT, now=59)
+    assert policy.should_poll(AGENT, now=60)
+    # Each failed probe doubles the wait, up to max_probe_interval
+    policy.record_failure(AGENT, now=60)
+    assert policy.agents[AGENT].next_probe == 180
+    policy.record_failure(AGENT, now=180)
+    assert policy.agents[AGENT].next_probe == 380
+
+
+def test_an_answer_lifts_the_quarantine():
+    policy = TimeoutPolicy(quarantine_after=1)
+    policy.record_failure(AGENT, now=0)
+    assert not policy.should_poll(AGENT, now=1)
+    policy.record_success(AGENT, 0.2)
+    assert policy.should_poll(AGENT, now=1)
+    assert policy.retries(AGENT) == 1
+    assert policy.quarantined() == []
@@ -0,0 +1,77 @@
+import socket
+import pytest
+from pyasn1.codec.ber import decoder, encoder
+from pysnmp.proto import api, rfc1902
+from trap_receiver import (parse_message, send_trap, describe, if_index, SYS_UPTIME_OID, SNMP_TRAP_OID,
+                           SNMP_TRAP_ADDRESS_OID)
+
+
+@pytest.fixture
+def sink():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(1)
+    yield sock
+    sock.close()
+
+
+def capture(sink, name, **options):
+    send_trap(name, '127.0.0.1', sink.getsockname()[1], timeout=0.01, **options)
+    return sink.recvfrom(65535)
+
+
+def test_v1_trap(sink):
+    message, address = capture(sink, "linkDown", if_index=3, version=0, uptime=4200)
+    event, response = parse_message(message, address)
+    assert response is None
+    assert (event.ip, event.port, event.version) == (address[0], address[1], 0)
+    assert event.agent == '127.0.0.1'  # pysnmp's default agent-addr
+    assert (event.name, event.uptime) == ("linkDown", 4200)
+    assert if_index(event) == 3
+    assert describe(event) == "linkDown ifIndex 3"
+
+
+def test_v1_enterprise_specific_trap(sink):
+    message, address = capture(sink, "1.3.6.1.4.1.8072.0.7", version=0)
+    event, _ = parse_message(message, address)
+    assert event.trap_oid == event.name == "1.3.6.1.4.1.8072.0.7"
+
+
+def test_v2c_trap(sink):
+    message, address = capture(sink, "coldStart", uptime=123)
+    event, response = parse_message(message, address)
+    assert response is None
+    assert (event.version, event.name, event.uptime) == (1, "coldStart", 123)
+    assert event.agent == address[0]
+    # sysUpTime and snmpTrapOID are taken out of the varbinds
+    assert event.varbinds == {}
+
+
+def test_v2c_inform_is_acknowledged(sink):
+    message, address = capture(sink, "linkUp", if_index=2, inform=True)
+    event, response = parse_message(message, address)
+    assert describe(event) == "linkUp ifIndex 2"
+    pMod = api.protoModules[api.protoVersion2c]
+    reply, _ = decoder.decode(response, asn1Spec=pMod.Message())
+    assert pMod.apiMessage.getPDU(reply).isSameTypeWith(pMod.ResponsePDU())
+
+
+def test_v2c_trap_address_names_the_agent():
+    pMod = api.protoModules[api.protoVersion2c]
+    pdu = pMod.SNMPv2TrapPDU()
+    pMod.apiPDU.setDefaults(pdu)
+    pMod.apiPDU.setVarBinds(pdu, [(rfc1902.ObjectName(SYS_UPTIME_OID), rfc1902.TimeTicks(1)),
+                                  (rfc1902.ObjectName(SNMP_TRAP_OID), rfc1902.ObjectIdentifier('1.3.6.1.6.3.1.1.5.1')),
+                                  (rfc1902.ObjectName(SNMP_TRAP_ADDRESS_OID), rfc1902.IpAddress('172.19.16.5'))])
+    message = pMod.Message()
+    pMod.apiMessage.setDefaults(message)
+    pMod.apiMessage.setCommunity(message, 'public')
+    pMod.apiMessage.setPDU(message, pdu)
+    event, _ = parse_message(encoder.encode(message), ('127.0.0.1', 40000))
+    assert (event.ip, event.agent) == ('127.0.0.1', '172.19.16.5')
+
+
+def test_unknown_community_is_dropped(sink):
+    message, address = capture(sink, "linkDown", community='private')
+    assert parse_message(message, address, communities={'public'}) == (None, None)
+    assert parse_message(message, address, communities={'private'})[0].name == "linkDown"